@@ -0,0 +1,165 @@
+"""Dashboard statistics kept in incrementally maintained rollup tables.
+
+post_rollups counts a user's posts by creation day, status and platform, and
+publish_rollups counts the publish legs that succeeded or failed by platform.
+Every write that creates, re-statuses, publishes or deletes posts records its
+change in the same transaction, so /analytics/summary never scans posts.
+
+Rebuild them from the source tables once after the tables are created, after a
+backfill, or to repair them:
+
+    cd backend
+    python -m app.analytics
+"""
+import logging
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import engine
+from .models import Post, PostRollup, PublishAttempt, PublishRollup
+from .social_media_integrations import platform_key
+
+logger = logging.getLogger(__name__)
+
+# Platform of the post_rollups rows that count every post once
+ALL_PLATFORMS = "*"
+# Leg states counted in publish_rollups, pending and in-progress legs have no outcome yet
+PUBLISH_OUTCOMES = ("succeeded", "failed")
+
+# (user_id, day, status, platforms)
+PostKey = Tuple[int, date, str, Tuple[str, ...]]
+
+
+def post_key(post) -> PostKey:
+    """The rollup rows a post counts in, takes a Post or a row with the same columns"""
+    platforms = tuple(dict.fromkeys(platform_key(platform) for platform in post.platforms or []))
+    return post.user_id, post.created_at.date(), post.status or "draft", platforms
+
+
+def post_rollup_deltas(changes: Iterable[Tuple[Optional[PostKey], Optional[PostKey]]]) -> Counter:
+    deltas = Counter()
+    for before, after in changes:
+        for key, sign in ((before, -1), (after, 1)):
+            if key is None:
+                continue
+            user_id, day, status, platforms = key
+            for platform in (ALL_PLATFORMS, *platforms):
+                deltas[(user_id, day, status, platform)] += sign
+    return deltas
+
+
+def publish_rollup_deltas(changes: Iterable[Tuple[int, PublishAttempt, Optional[str], Optional[str]]]) -> Counter:
+    deltas = Counter()
+    for user_id, attempt, before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state in PUBLISH_OUTCOMES:
+                deltas[(user_id, attempt.created_at.date(), attempt.platform, state)] += sign
+    return deltas
+
+
+async def increment(db: AsyncSession, model, deltas: Counter):
+    """Add the deltas to the rollup rows keyed by the model's primary key, creating missing rows"""
+    keys = [column.name for column in model.__table__.primary_key.columns]
+    # Sorted so that concurrent writers lock rows in the same order
+    rows = [dict(zip(keys, key), count=delta) for key, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        statement = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(model)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys, set_={"count": model.count + statement.excluded.count}
+        )
+        await db.execute(statement, rows)
+        return
+
+    for row in rows:
+        result = await db.execute(
+            update(model)
+            .where(*(getattr(model, key) == row[key] for key in keys))
+            .values(count=model.count + row["count"])
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await db.execute(insert(model), [row])
+
+
+async def record_post_changes(db: AsyncSession, changes: Iterable[Tuple[Optional[PostKey], Optional[PostKey]]]):
+    """Apply (before, after) post keys to post_rollups, None before a create and after a delete"""
+    await increment(db, PostRollup, post_rollup_deltas(changes))
+
+
+async def record_post_change(db: AsyncSession, before: Optional[PostKey], after: Optional[PostKey]):
+    if before != after:
+        await record_post_changes(db, [(before, after)])
+
+
+async def record_publish_changes(db: AsyncSession, changes: Iterable[Tuple[int, PublishAttempt, Optional[str], Optional[str]]]):
+    """Apply (user_id, attempt, state before, state after) leg transitions to publish_rollups"""
+    await increment(db, PublishRollup, publish_rollup_deltas(changes))
+
+
+async def post_keys(db: AsyncSession, post_ids: Iterable[int]) -> Dict[int, PostKey]:
+    result = await db.execute(
+        select(Post.id, Post.user_id, Post.created_at, Post.status, Post.platforms).where(Post.id.in_(set(post_ids)))
+    )
+    return {row.id: post_key(row) for row in result}
+
+
+async def record_posts_removed(db: AsyncSession, post_ids: Iterable[int]):
+    """Take posts that are about to be deleted, and their publish legs, out of the rollups"""
+    post_ids = set(post_ids)
+    keys = await post_keys(db, post_ids)
+    await record_post_changes(db, [(key, None) for key in keys.values()])
+
+    result = await db.execute(
+        select(Post.user_id, PublishAttempt)
+        .join(Post, Post.id == PublishAttempt.post_id)
+        .where(PublishAttempt.post_id.in_(post_ids), PublishAttempt.state.in_(PUBLISH_OUTCOMES))
+    )
+    await record_publish_changes(db, [(user_id, attempt, attempt.state, None) for user_id, attempt in result])
+
+
+def rebuild_rollups(bind: Engine = engine, batch_size: int = 5000) -> Tuple[int, int]:
+    """Recompute both rollup tables from posts and publish_attempts, returns the number of rows written"""
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # Writers that have not committed yet wait here and apply their change on top of the rebuilt rows
+            connection.execute(text("LOCK TABLE post_rollups, publish_rollups IN EXCLUSIVE MODE"))
+        # On SQLite the deletes take the write lock before the source tables are read
+        connection.execute(delete(PostRollup))
+        connection.execute(delete(PublishRollup))
+
+        posts = connection.execute(
+            select(Post.user_id, Post.created_at, Post.status, Post.platforms).execution_options(yield_per=batch_size)
+        )
+        post_counts = post_rollup_deltas((None, post_key(row)) for row in posts)
+
+        legs = connection.execute(
+            select(Post.user_id, PublishAttempt.created_at, PublishAttempt.platform, PublishAttempt.state)
+            .join(Post, Post.id == PublishAttempt.post_id)
+            .where(PublishAttempt.state.in_(PUBLISH_OUTCOMES))
+            .execution_options(yield_per=batch_size)
+        )
+        publish_counts = publish_rollup_deltas((row.user_id, row, None, row.state) for row in legs)
+
+        written = []
+        for model, counts in ((PostRollup, post_counts), (PublishRollup, publish_counts)):
+            keys = [column.name for column in model.__table__.primary_key.columns]
+            rows: List[dict] = [dict(zip(keys, key), count=count) for key, count in counts.items() if count]
+            for start in range(0, len(rows), batch_size):
+                connection.execute(insert(model), rows[start:start + batch_size])
+            written.append(len(rows))
+    return written[0], written[1]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    post_rows, publish_rows = rebuild_rollups()
+    logger.info("Rebuilt %s post rollup rows and %s publish rollup rows", post_rows, publish_rows)
@@ -1,28 +1,57 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 import hashlib
-import os
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .cache import Cache
 from .config import settings
 from .database import get_db
+from .hashing import password_hasher
+from .metrics import register_provider
 from .models import User
 from .schemas import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    salt = hashed_password[:64]
-    stored_hash = hashed_password[64:]
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', plain_password.encode('utf-8'), bytes.fromhex(salt), 100000)
-    return pwd_hash.hex() == stored_hash
+PRINCIPAL_FIELDS = ("id", "email", "username", "created_at", "is_active")
+# Tokens remembered per subject with PRINCIPAL_CACHE_KEY_BY_TOKEN
+PRINCIPAL_TOKENS_PER_SUBJECT = 8
+
+
+def principal_snapshot(user: User) -> Dict:
+    """Only the public user fields are cached"""
+    snapshot = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+    snapshot["created_at"] = snapshot["created_at"].isoformat() if snapshot["created_at"] else None
+    return snapshot
+
+
+def principal_from_snapshot(snapshot: Dict) -> User:
+    """A transient User that is not attached to any session"""
+    fields = {field: snapshot[field] for field in PRINCIPAL_FIELDS}
+    fields["created_at"] = datetime.fromisoformat(fields["created_at"]) if fields["created_at"] else None
+    return User(**fields)
+
+
+# One entry per token subject (email), shared by the workers through the cache backend
+principal_cache = Cache("principal", settings.principal_cache_ttl_seconds, settings.principal_cache_size)
+register_provider("principal_cache", principal_cache.stats)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_principal(mapper, connection, target):
+    # Covers is_active flips as well as email changes, which move the token subject
+    principal_cache.delete_soon(target.email)
+    for previous_email in inspect(target).attrs.email.history.deleted or ():
+        principal_cache.delete_soon(previous_email)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_principal(mapper, connection, target):
+    principal_cache.delete_soon(target.email)
 
-def get_password_hash(password: str) -> str:
-    salt = os.urandom(32)
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    return salt.hex() + pwd_hash.hex()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,18 +63,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,9 +89,21 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = get_user_by_email(db, email=token_data.email)
+    
+    cached = None
+    if settings.principal_cache_enabled:
+        token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest() if settings.principal_cache_key_by_token else ""
+        cached = await principal_cache.get(token_data.email)
+        if cached is not None and token_hash in cached["token_hashes"]:
+            return principal_from_snapshot(cached)
+    
+    user = await get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
+    if settings.principal_cache_enabled:
+        token_hashes = [known for known in (cached or {}).get("token_hashes", []) if known != token_hash]
+        token_hashes = token_hashes[-(PRINCIPAL_TOKENS_PER_SUBJECT - 1):] + [token_hash]
+        await principal_cache.set(token_data.email, {**principal_snapshot(user), "token_hashes": token_hashes})
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
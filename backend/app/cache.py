@@ -0,0 +1,382 @@
+"""Caches that stay coherent across uvicorn workers and replicas.
+
+CACHE_BACKEND selects where entries are shared:
+
+  memory  nothing is shared, each process keeps its own LRU (the default)
+  sqlite  a SQLite file shared by the workers of one host; put CACHE_SQLITE_PATH
+          under /dev/shm to keep it in shared memory
+  redis   any Redis-protocol server at CACHE_REDIS_URL, shared across hosts
+          (needs the redis package; benchmarks/fake_redis.py is a local stand-in)
+
+Every cache is a namespace with its own TTL and a bounded per-process LRU. With
+a shared backend the local copies live at most CACHE_LOCAL_TTL_SECONDS, and
+deleting a key publishes an invalidation that drops the copies held by the
+other processes.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .config import settings
+from .metrics import register_provider
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCacheBackend:
+    """Entries and an invalidation log in one SQLite file, the log is polled by every process"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidations "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl_seconds: float):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl_seconds)
+            )
+            self._writes += 1
+            # Expired rows are only skipped on read, sweep them now and then
+            if self._writes % 256 == 0:
+                self._connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+
+    def _delete(self, keys: List[str], message: str):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+            self._connection.execute(
+                "INSERT INTO cache_invalidations (message, created_at) VALUES (?, ?)", (message, time.time())
+            )
+            # Every listener polls far more often than this
+            self._connection.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (time.time() - 3600,))
+            self._connection.execute("COMMIT")
+
+    def _messages_after(self, last_id: Optional[int]) -> List[Tuple[int, str]]:
+        with self._lock:
+            if last_id is None:
+                row = self._connection.execute("SELECT max(id) FROM cache_invalidations").fetchone()
+                return [(row[0] or 0, "")]
+            return self._connection.execute(
+                "SELECT id, message FROM cache_invalidations WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+    async def delete(self, keys: List[str], message: str):
+        """Delete the keys and publish the invalidation message in one transaction"""
+        await asyncio.to_thread(self._delete, keys, message)
+
+    async def subscribe(self, callback: Callable[[str], None]):
+        """Deliver invalidation messages published after the call until cancelled"""
+        (last_id, _), = await asyncio.to_thread(self._messages_after, None)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for last_id, message in await asyncio.to_thread(self._messages_after, last_id):
+                callback(message)
+
+    async def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class RedisCacheBackend:
+    """Entries as keys with an expiry, invalidations on a pub/sub channel"""
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str):
+        # Only imported with CACHE_BACKEND=redis, it adds tens of milliseconds to every start
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package") from None
+        self._redis = redis
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._loop = None
+
+    def client(self):
+        # Connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # RESP2 is spoken by every Redis-compatible server, including the local stand-in
+            self._client = self._redis.from_url(self.url, protocol=2)
+            self._loop = loop
+        return self._client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client().get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self.client().set(key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def delete(self, keys: List[str], message: str):
+        async with self.client().pipeline(transaction=True) as pipeline:
+            await pipeline.delete(*keys).publish(self.channel, message).execute()
+
+    async def subscribe(self, callback: Callable[[str], None]):
+        pubsub = self.client().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    callback(message["data"].decode("utf-8"))
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The shared backend selected by CACHE_BACKEND, None for the per-process memory backend"""
+    global _backend
+    if settings.cache_backend == "memory":
+        return None
+    with _backend_lock:
+        if _backend is None:
+            if settings.cache_backend == "sqlite":
+                path = settings.cache_sqlite_path or os.path.join(tempfile.gettempdir(), "socialspark-cache.db")
+                _backend = SQLiteCacheBackend(path, settings.cache_invalidation_poll_seconds)
+            elif settings.cache_backend == "redis":
+                _backend = RedisCacheBackend(settings.cache_redis_url, f"{settings.cache_key_prefix}:invalidate")
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND {settings.cache_backend!r}")
+    return _backend
+
+
+_caches: Dict[str, "Cache"] = {}
+
+
+class Cache:
+    """A namespace of JSON values with a TTL, a per-process LRU in front of the shared backend"""
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_entries: int, backend=None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._backend = backend
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        _caches[namespace] = self
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else get_backend()
+
+    def _shared_key(self, key: str) -> str:
+        return f"{settings.cache_key_prefix}:{self.namespace}:{key}"
+
+    def _local_ttl(self) -> float:
+        if self.backend is None:
+            return self.ttl_seconds
+        return min(self.ttl_seconds, settings.cache_local_ttl_seconds)
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self._local_ttl(), value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+                self.evictions += 1
+
+    def _local_get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._local[key]
+                return False, None
+            self._local.move_to_end(key)
+            return True, entry[1]
+
+    def drop_local(self, key: Optional[str] = None):
+        """Forget the local copy of a key, or of every key"""
+        with self._lock:
+            if key is None:
+                self._local.clear()
+            else:
+                self._local.pop(key, None)
+
+    async def get(self, key: str) -> Optional[Any]:
+        found, value = self._local_get(key)
+        if found:
+            self.local_hits += 1
+            return value
+
+        backend = self.backend
+        if backend is not None:
+            try:
+                raw = await backend.get(self._shared_key(key))
+            except Exception as e:
+                # A cache outage degrades to misses, it must not fail requests
+                logger.warning("Cache %s read failed: %s", backend.name, e)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.shared_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        self._remember(key, value)
+        backend = self.backend
+        if backend is not None:
+            try:
+                await backend.set(self._shared_key(key), json.dumps(value, default=str).encode("utf-8"), self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Cache %s write failed: %s", backend.name, e)
+
+    async def delete(self, key: str):
+        """Remove the key everywhere and tell the other processes to drop their copies"""
+        self.drop_local(key)
+        self.invalidations += 1
+        backend = self.backend
+        if backend is not None:
+            try:
+                await backend.delete([self._shared_key(key)], f"{self.namespace}:{key}")
+            except Exception as e:
+                logger.warning("Cache %s invalidation failed: %s", backend.name, e)
+
+    def delete_soon(self, key: str):
+        """delete() for synchronous callers such as ORM events, the shared part runs as a task"""
+        self.drop_local(key)
+        if self.backend is None:
+            self.invalidations += 1
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self.delete(key))
+        except RuntimeError:
+            # No event loop (command line tools), other processes expire the entry by its TTL
+            logger.warning("Cache %s key %s could not be invalidated outside the event loop", self.namespace, key)
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def stats(self) -> Dict:
+        hits = self.local_hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _on_invalidation(message: str):
+    namespace, _, key = message.partition(":")
+    cache = _caches.get(namespace)
+    if cache is not None:
+        cache.drop_local(key)
+
+
+class InvalidationListener:
+    """Drops local copies when another process invalidates a key"""
+
+    def __init__(self):
+        self.messages = 0
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _deliver(self, message: str):
+        self.messages += 1
+        _on_invalidation(message)
+
+    async def run_forever(self):
+        backend = get_backend()
+        while True:
+            try:
+                await backend.subscribe(self._deliver)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener lost %s: %s", backend.name, e)
+            # Invalidations may have been missed while disconnected
+            for cache in _caches.values():
+                cache.drop_local()
+            self.reconnects += 1
+            await asyncio.sleep(1.0)
+
+    def start(self):
+        if get_backend() is None:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {"messages": self.messages, "reconnects": self.reconnects}
+
+
+invalidation_listener = InvalidationListener()
+register_provider("cache_invalidations", invalidation_listener.stats)
+
+
+async def close_cache():
+    global _backend
+    await invalidation_listener.stop()
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -1,13 +1,32 @@
 import os
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from sqlalchemy.engine import make_url
 
 class Settings(BaseSettings):
     database_url: str = Field(default_factory=lambda: os.getenv("DATABASE_URL", ""))
+    # Optional explicit URL for the async engine, derived from database_url when empty
+    database_async_url: str = Field(default_factory=lambda: os.getenv("DATABASE_ASYNC_URL", ""))
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_pre_ping: bool = True
     secret_key: str = Field(default_factory=lambda: os.getenv("SESSION_SECRET", "your-secret-key-change-in-production"))
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 7
     gemini_api_key: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEY", ""))
+    # Empty values keep the SDK defaults (gRPC against the public endpoint)
+    gemini_transport: str = ""
+    gemini_api_endpoint: str = ""
+    # Concurrent Gemini calls per worker process, in total and per user
+    gemini_max_concurrency: int = 16
+    gemini_max_concurrency_per_user: int = 4
+    # Covers waiting for a slot and the call itself
+    gemini_request_timeout_seconds: float = 30.0
+    # Consecutive failures that open the circuit, and how long it stays open
+    gemini_breaker_failure_threshold: int = 5
+    gemini_breaker_cooldown_seconds: float = 30.0
     
     # X/Twitter API credentials
     x_api_key: str = Field(default_factory=lambda: os.getenv("X_API_KEY", ""))
@@ -16,18 +35,137 @@ class Settings(BaseSettings):
     x_access_token: str = Field(default_factory=lambda: os.getenv("X_ACCESS_TOKEN", ""))
     x_access_token_secret: str = Field(default_factory=lambda: os.getenv("X_ACCESS_TOKEN_SECRET", ""))
     
+    x_api_base_url: str = "https://api.twitter.com"
+    
     # Threads API credentials
     threads_app_id: str = Field(default_factory=lambda: os.getenv("THREADS_APP_ID", ""))
     threads_app_secret: str = Field(default_factory=lambda: os.getenv("THREADS_APP_SECRET", ""))
+    threads_api_base_url: str = "https://graph.threads.net/v1.0"
     
     # Instagram API credentials
     instagram_app_id: str = Field(default_factory=lambda: os.getenv("INSTAGRAM_APP_ID", ""))
     instagram_app_secret: str = Field(default_factory=lambda: os.getenv("INSTAGRAM_APP_SECRET", ""))
+    instagram_api_base_url: str = "https://graph.instagram.com/v18.0"
+    
+    # Shared cache backend, "memory", "sqlite" or "redis", see cache.py
+    cache_backend: str = "memory"
+    cache_sqlite_path: str = ""
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_key_prefix: str = "socialspark"
+    # Lifetime of a process's own copy of a shared entry
+    cache_local_ttl_seconds: float = 5.0
+    cache_invalidation_poll_seconds: float = 0.5
+    
+    # Generated content cache, max_entries bounds each process's copies
+    generation_cache_enabled: bool = True
+    generation_cache_max_entries: int = 2048
+    generation_cache_ttl_seconds: float = 60 * 60 * 24
+    
+    # Batch content generation
+    generation_batch_concurrency: int = 4
+    generation_batch_max_items: int = 50
+    
+    # Password hashing pool
+    password_hash_workers: int = Field(default_factory=lambda: min(4, os.cpu_count() or 1))
+    password_hash_max_queue: int = 64
+    password_hash_use_processes: bool = False
+    
+    # Authenticated user cache
+    principal_cache_enabled: bool = True
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 60.0
+    principal_cache_key_by_token: bool = False
+    
+    # Content preferences cache, read by content generation
+    preferences_cache_enabled: bool = True
+    preferences_cache_size: int = 10000
+    preferences_cache_ttl_seconds: float = 300.0
+    
+    # Per platform account publish budgets, refined from the platforms' rate limit headers
+    publish_rate_limit_burst: float = 10
+    publish_rate_limit_per_second: float = 1.0
+    publish_rate_limit_max_retries: int = 5
+    publish_rate_limit_backoff_seconds: float = 2.0
+    publish_rate_limit_max_wait_seconds: float = 120.0
+    meta_usage_block_percent: float = 95.0
+    
+    # Post listing pagination
+    posts_page_size_default: int = 50
+    posts_page_size_max: int = 200
+    posts_bulk_max_items: int = 1000
+    # Post search ranks matches in windows of this many, newest first
+    search_rank_window: int = 1000
+    
+    # Outbound publishing
+    publish_max_workers: int = 16
+    outbound_http2: bool = True
+    outbound_max_connections: int = 100
+    outbound_max_keepalive_connections: int = 20
+    outbound_keepalive_expiry_seconds: float = 30.0
+    outbound_connect_timeout_seconds: float = 5.0
+    x_publish_timeout_seconds: float = 15.0
+    threads_publish_timeout_seconds: float = 15.0
+    instagram_publish_timeout_seconds: float = 30.0
+    # Pause between status checks of an Instagram media container before it is published
+    instagram_container_poll_seconds: float = 1.0
+    
+    # Base URL the platforms reach this API at, they fetch post images from it
+    public_base_url: str = "http://localhost:8000"
+    # Uploaded images and their renditions, see media.py
+    media_storage_path: str = "./media"
+    media_max_upload_bytes: int = 20 * 1024 * 1024
+    media_render_workers: int = Field(default_factory=lambda: min(2, os.cpu_count() or 1))
+    
+    # Near-duplicate post detection: "off", "flag" (X-Near-Duplicate-Of header) or "block" (409)
+    near_duplicate_action: str = "flag"
+    near_duplicate_threshold: float = 0.85
+    near_duplicate_index_max_users: int = 10000
+    near_duplicate_index_ttl_seconds: float = 300.0
+    
+    # Response encoding, orjson and brotli are used when installed
+    fast_serialization: bool = True
+    response_compression_enabled: bool = True
+    response_compression_min_size: int = 1024
+    gzip_compress_level: int = 6
+    brotli_quality: int = 4
+    
+    # Requests slower than this are logged with their query breakdown, 0 disables the log
+    slow_request_threshold_ms: float = 0
+    
+    # Scheduled post dispatcher
+    dispatcher_enabled: bool = False
+    dispatcher_poll_interval_seconds: float = 5.0
+    dispatcher_batch_size: int = 50
+    dispatcher_lease_seconds: int = 300
+    
+    # Publish outbox, one attempt row per post and platform
+    publish_attempt_lease_seconds: int = 300
+    outbox_reconciler_enabled: bool = False
+    outbox_reconciler_interval_seconds: float = 30.0
+    outbox_reconciler_batch_size: int = 500
+    outbox_reconciler_concurrency: int = 32
     
     class Config:
         env_file = ".env"
         case_sensitive = False
 
+    @property
+    def async_database_url(self) -> str:
+        """database_url rewritten for its async driver (asyncpg for PostgreSQL, aiosqlite for SQLite)"""
+        if self.database_async_url:
+            return self.database_async_url
+        url = make_url(self.database_url)
+        backend = url.get_backend_name()
+        if backend in ("postgresql", "postgres"):
+            query = dict(url.query)
+            # asyncpg does not understand libpq's sslmode parameter
+            if "sslmode" in query:
+                query["ssl"] = query.pop("sslmode")
+            url = url.set(drivername="postgresql+asyncpg", query=query)
+        elif backend == "sqlite":
+            url = url.set(drivername="sqlite+aiosqlite")
+        return url.render_as_string(hide_password=False)
+
     def validate_config(self):
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable is required")
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .analytics import post_key, record_post_changes
+from .config import settings
+from .database import AsyncSessionLocal
+from .metrics import register_provider
+from .models import Post
+from .publishing import apply_publishing_results, publish_post_attempts
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherMetrics:
+    """Counters and publish lag (actual publish time minus scheduled time) for the dispatcher"""
+
+    def __init__(self, window: int = 1000):
+        self.polls = 0
+        self.claimed = 0
+        self.published = 0
+        self.failed = 0
+        self.requeued = 0
+        self.errors = 0
+        self.last_poll_at: Optional[datetime] = None
+        self.lag_samples = deque(maxlen=window)
+        self.max_lag_seconds = 0.0
+
+    def observe_lag(self, seconds: float):
+        self.lag_samples.append(seconds)
+        self.max_lag_seconds = max(self.max_lag_seconds, seconds)
+
+    def _percentile(self, ordered: List[float], fraction: float) -> Optional[float]:
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict:
+        ordered = sorted(self.lag_samples)
+        return {
+            "polls": self.polls,
+            "claimed": self.claimed,
+            "published": self.published,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "errors": self.errors,
+            "last_poll_at": self.last_poll_at.isoformat() if self.last_poll_at else None,
+            "lag_seconds_p50": self._percentile(ordered, 0.5),
+            "lag_seconds_p95": self._percentile(ordered, 0.95),
+            "lag_seconds_max": self.max_lag_seconds,
+        }
+
+
+class ScheduledPostDispatcher:
+    """Claims due scheduled posts in batches and publishes them.
+
+    Posts are claimed by moving them to the "publishing" status under a lease.
+    On PostgreSQL the claim uses FOR UPDATE SKIP LOCKED so several replicas can
+    poll concurrently without claiming the same rows; a lease that expires (for
+    example because its replica died) makes the post claimable again.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, batch_size: Optional[int] = None,
+                 lease_seconds: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.dispatcher_batch_size
+        self.lease_seconds = lease_seconds or settings.dispatcher_lease_seconds
+        self.poll_interval = poll_interval or settings.dispatcher_poll_interval_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.metrics = DispatcherMetrics()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def claim_due_posts(self, db: AsyncSession) -> List[int]:
+        now = datetime.utcnow()
+        query = select(Post).where(
+            or_(
+                and_(Post.status == "scheduled", Post.scheduled_time <= now),
+                and_(Post.status == "publishing", Post.lease_expires_at < now),
+            )
+        ).order_by(Post.scheduled_time).limit(self.batch_size)
+
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+
+        posts = (await db.execute(query)).scalars().all()
+        changes = []
+        for post in posts:
+            before = post_key(post)
+            post.status = "publishing"
+            post.lease_owner = self.worker_id
+            post.lease_expires_at = now + timedelta(seconds=self.lease_seconds)
+            changes.append((before, post_key(post)))
+        await record_post_changes(db, changes)
+        await db.commit()
+        return [post.id for post in posts]
+
+    async def publish_claimed_post(self, post_id: int) -> Optional[bool]:
+        async with self.session_factory() as db:
+            post = await db.get(Post, post_id)
+            if not post or post.status != "publishing" or post.lease_owner != self.worker_id:
+                # The lease was lost to another dispatcher in the meantime
+                return None
+            attempts, _ = await publish_post_attempts(db, post)
+
+            await db.refresh(post)
+            if post.lease_owner != self.worker_id:
+                # Keep the recorded platform outcomes even though the post belongs to another dispatcher now
+                await db.commit()
+                return None
+            any_success = await apply_publishing_results(db, post, attempts, requeue_rate_limited=True)
+            if any_success and post.scheduled_time:
+                self.metrics.observe_lag((post.published_at - post.scheduled_time).total_seconds())
+            await db.commit()
+            if post.status in ("scheduled", "publishing"):
+                # Requeued behind a rate limit, or a leg is still in flight elsewhere
+                if post.status == "scheduled":
+                    self.metrics.requeued += 1
+                return None
+            return any_success
+
+    async def run_once(self) -> int:
+        """Claim one batch of due posts and publish them, returns the number that got an outcome"""
+        self.metrics.polls += 1
+        self.metrics.last_poll_at = datetime.utcnow()
+
+        async with self.session_factory() as db:
+            post_ids = await self.claim_due_posts(db)
+        self.metrics.claimed += len(post_ids)
+
+        outcomes = await asyncio.gather(
+            *(self.publish_claimed_post(post_id) for post_id in post_ids),
+            return_exceptions=True
+        )
+        settled = 0
+        for post_id, outcome in zip(post_ids, outcomes):
+            if isinstance(outcome, Exception):
+                self.metrics.errors += 1
+                logger.error("Failed to dispatch post %s: %s", post_id, outcome)
+            elif outcome is True:
+                self.metrics.published += 1
+                settled += 1
+            elif outcome is False:
+                self.metrics.failed += 1
+                settled += 1
+        return settled
+
+    async def run_forever(self):
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                settled = await self.run_once()
+            except Exception:
+                self.metrics.errors += 1
+                logger.exception("Scheduled post dispatcher poll failed")
+                settled = 0
+            # A full batch of published posts means there is likely more work due, poll again right away
+            if settled >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+
+dispatcher = ScheduledPostDispatcher()
+register_provider("dispatcher", dispatcher.metrics.snapshot)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(dispatcher.run_forever())
@@ -0,0 +1,293 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from fastapi import HTTPException, status
+from .config import settings
+from .instrumentation import track_outbound
+from .metrics import register_provider
+
+GEMINI_MODEL_NAME = 'gemini-2.5-flash'
+
+_STREAM_DONE = object()
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def initialize_gemini():
+    if settings.gemini_api_key:
+        # The SDK pulls in grpc and protobuf, only load it once content is generated
+        import google.generativeai as genai
+
+        options = {"api_key": settings.gemini_api_key}
+        if settings.gemini_transport:
+            options["transport"] = settings.gemini_transport
+        if settings.gemini_api_endpoint:
+            options["client_options"] = {"api_endpoint": settings.gemini_api_endpoint}
+        genai.configure(**options)
+        return genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return None
+
+
+def uses_rest_transport() -> bool:
+    # The SDK's async client only speaks gRPC, with REST the sync client runs on a worker thread
+    return settings.gemini_transport == "rest"
+
+
+def counts_as_failure(error: Exception) -> bool:
+    """Timeouts and server side errors; a rejected request (4xx other than 429) says nothing about Gemini's health"""
+    code = getattr(error, "code", None)
+    return not (isinstance(code, int) and 400 <= code < 500 and code != 429)
+
+
+class GeminiLimiter:
+    """Bounds concurrent Gemini calls globally and per user, with a deadline and a circuit breaker.
+
+    A call waits for a slot of its user and then a global slot; the deadline
+    covers the wait and the call. After `failure_threshold` consecutive failures
+    the circuit opens and calls are refused with 503 without reaching Gemini.
+    Once the cooldown has passed one probe call is let through, its outcome
+    closes the circuit or opens it again. Limits are per worker process.
+    """
+
+    def __init__(self, max_concurrency: int, max_per_user: int, timeout_seconds: float,
+                 failure_threshold: int, cooldown_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._global = asyncio.Semaphore(max_concurrency)
+        # Per-user semaphores with the number of calls holding or waiting for them
+        self._users: Dict[Optional[int], list] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._probing = False
+
+    def executor(self) -> ThreadPoolExecutor:
+        """Threads for the REST transport's blocking calls, apart from the loop's default executor"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _unavailable(self, detail: str, retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def check(self):
+        """Raise the 503 a call would get right now, lets streams fail before their response starts"""
+        if self.state == "open":
+            remaining = self.opened_at + self.cooldown_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise self._unavailable(
+                    "Content generation is temporarily unavailable because Gemini is failing, please retry shortly",
+                    remaining,
+                )
+            self.state = "half_open"
+        if self.state == "half_open" and self._probing:
+            self.rejected += 1
+            raise self._unavailable(
+                "Content generation is temporarily unavailable while Gemini recovers, please retry shortly", 1
+            )
+
+    def _admit(self) -> bool:
+        """Whether the admitted call is the half-open probe"""
+        self.check()
+        if self.state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def _record(self, probe: bool, error: Optional[BaseException]):
+        if probe:
+            self._probing = False
+        if error is None:
+            self.completed += 1
+            self.consecutive_failures = 0
+            self.state = "closed"
+            return
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)) or not counts_as_failure(error):
+            # The caller went away or sent a bad request, the next call becomes the probe
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if probe or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, deadline: float):
+        try:
+            await asyncio.wait_for(semaphore.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            raise self._unavailable("Too many content generations in progress, please retry", 1) from None
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[int]):
+        """Hold a user and a global slot for one Gemini call, yields the deadline (time.monotonic)"""
+        deadline = time.monotonic() + self.timeout_seconds
+        probe = self._admit()
+        entry = self._users.setdefault(user_id, [asyncio.Semaphore(self.max_per_user), 0])
+        entry[1] += 1
+        self.queued += 1
+        acquired = []
+        try:
+            try:
+                for semaphore in (entry[0], self._global):
+                    await self._acquire(semaphore, deadline)
+                    acquired.append(semaphore)
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+            try:
+                yield deadline
+            except asyncio.TimeoutError as e:
+                self.timeouts += 1
+                self._record(probe, e)
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail=f"Gemini did not respond within {self.timeout_seconds:g} seconds",
+                ) from None
+            except BaseException as e:
+                self._record(probe, e)
+                raise
+            else:
+                self._record(probe, None)
+            finally:
+                self.in_flight -= 1
+        except BaseException:
+            # Never got to call Gemini, the probe has to be handed to the next caller
+            if probe and self._probing:
+                self._probing = False
+            raise
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+            entry[1] -= 1
+            if entry[1] == 0 and self._users.get(user_id) is entry:
+                del self._users[user_id]
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "users": len(self._users),
+            "completed": self.completed,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "circuit_state": CIRCUIT_STATES[self.state],
+            "circuit_open": self.state == "open",
+            "circuit_opened": self.opened,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+gemini_limiter = GeminiLimiter(
+    max_concurrency=settings.gemini_max_concurrency,
+    max_per_user=settings.gemini_max_concurrency_per_user,
+    timeout_seconds=settings.gemini_request_timeout_seconds,
+    failure_threshold=settings.gemini_breaker_failure_threshold,
+    cooldown_seconds=settings.gemini_breaker_cooldown_seconds,
+)
+register_provider("gemini", gemini_limiter.stats)
+
+
+def _remaining(deadline: float) -> float:
+    return max(deadline - time.monotonic(), 0.001)
+
+
+async def generate(model, prompt: str, user_id: Optional[int] = None, **kwargs):
+    async with gemini_limiter.slot(user_id) as deadline:
+        with track_outbound("gemini") as call:
+            # The SDK gets the deadline too, so a call we stop waiting for does not keep running
+            kwargs["request_options"] = {"timeout": _remaining(deadline)}
+            if uses_rest_transport():
+                loop = asyncio.get_running_loop()
+                pending = loop.run_in_executor(
+                    gemini_limiter.executor(), lambda: model.generate_content(prompt, **kwargs)
+                )
+            else:
+                pending = model.generate_content_async(prompt, **kwargs)
+            try:
+                response = await asyncio.wait_for(pending, _remaining(deadline))
+            except asyncio.TimeoutError:
+                call.outcome = "timeout"
+                raise
+            call.outcome = "success"
+            return response
+
+
+async def stream_text(model, prompt: str, user_id: Optional[int] = None) -> AsyncIterator[str]:
+    """Yield text chunks as Gemini produces them, the deadline covers the whole stream"""
+    async with gemini_limiter.slot(user_id) as deadline:
+        with track_outbound("gemini_stream") as call:
+            chunks = _stream_text(model, prompt, _remaining(deadline))
+            try:
+                while True:
+                    try:
+                        text = await asyncio.wait_for(chunks.__anext__(), _remaining(deadline))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        call.outcome = "timeout"
+                        raise
+                    yield text
+            finally:
+                await chunks.aclose()
+            call.outcome = "success"
+
+
+async def _stream_text(model, prompt: str, timeout: float) -> AsyncIterator[str]:
+    request_options = {"timeout": timeout}
+    if not uses_rest_transport():
+        stream = await model.generate_content_async(prompt, stream=True, request_options=request_options)
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def pump():
+        try:
+            for chunk in model.generate_content(prompt, stream=True, request_options=request_options):
+                if chunk.text:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            loop.call_soon_threadsafe(queue.put_nowait, _STREAM_DONE)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    pump_future = loop.run_in_executor(gemini_limiter.executor(), pump)
+    while True:
+        item = await queue.get()
+        if item is _STREAM_DONE:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await pump_future
@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import Dict, Tuple
+from .cache import Cache
+from .config import settings
+from .metrics import register_provider
+from .single_flight import SingleFlight
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split()).casefold()
+
+
+def generation_cache_key(model_name: str, prompts: Tuple[str, ...], preferences: Dict) -> str:
+    """Stable key over the model, the normalized prompts and the preference fields that shape the output"""
+    material = json.dumps({
+        "model": model_name,
+        "prompts": [normalize_prompt(prompt) for prompt in prompts],
+        "preferences": preferences,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GenerationCache(Cache):
+    """Generated content by generation_cache_key, shared by the workers through the cache backend.
+
+    Entries never go stale (the key covers everything that shapes the output), so
+    they are only ever dropped by their TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        super().__init__("generation", ttl_seconds, max_entries)
+        self.bypasses = 0
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def stats(self) -> Dict:
+        return {**super().stats(), "bypasses": self.bypasses}
+
+
+generation_cache = GenerationCache(
+    max_entries=settings.generation_cache_max_entries,
+    ttl_seconds=settings.generation_cache_ttl_seconds,
+)
+register_provider("generation_cache", generation_cache.stats)
+
+# Identical generations in flight at the same time, keyed like the cache
+generation_flights = SingleFlight()
+register_provider("generation_single_flight", generation_flights.stats)
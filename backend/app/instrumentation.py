@@ -0,0 +1,136 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from .config import settings
+from .metrics import histogram
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+REQUEST_QUERIES = histogram(
+    "http_request_db_queries", "Database queries issued per request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+DB_QUERY_DURATION = histogram(
+    "db_query_duration_seconds", "Database statement latency by statement type", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+OUTBOUND_DURATION = histogram(
+    "outbound_request_duration_seconds", "Latency of calls to Gemini and the social platforms", ("platform", "outcome")
+)
+
+
+class RequestStats:
+    """Per-request accumulator filled by the database hooks and outbound call tracking"""
+
+    def __init__(self, record_statements: bool):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.outbound: List[tuple] = []
+        # Statement text -> [count, seconds], only kept when the slow request log is on
+        self.statements: Optional[Dict[str, List[float]]] = {} if record_statements else None
+
+    def record_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.query_seconds += seconds
+        if self.statements is not None:
+            entry = self.statements.setdefault(" ".join(statement.split())[:200], [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_request.get()
+
+
+def instrument_engine(engine):
+    """Attach query timing hooks to a sync Engine (pass AsyncEngine.sync_engine for async engines)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_DURATION.observe(elapsed, operation)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.record_query(statement, elapsed)
+
+
+class OutboundCall:
+    def __init__(self):
+        self.outcome = "error"
+
+
+@contextmanager
+def track_outbound(platform: str):
+    """Time an outbound call, the caller sets `outcome` on the yielded object once it knows it"""
+    call = OutboundCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - started
+        OUTBOUND_DURATION.observe(elapsed, platform, call.outcome)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.outbound.append((platform, call.outcome, elapsed))
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware recording per-route latency and query counts, and logging slow requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_threshold = settings.slow_request_threshold_ms / 1000
+        stats = RequestStats(record_statements=slow_threshold > 0)
+        token = _current_request.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            # Route templates keep label cardinality bounded, unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(elapsed, scope["method"], route, str(status_code))
+            REQUEST_QUERIES.observe(stats.queries, route)
+            if slow_threshold > 0 and elapsed >= slow_threshold:
+                self._log_slow_request(scope["method"], route, status_code, elapsed, stats)
+
+    def _log_slow_request(self, method: str, route: str, status_code: int, elapsed: float, stats: RequestStats):
+        breakdown = sorted(stats.statements.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [
+            f"Slow request {method} {route} -> {status_code} took {elapsed * 1000:.1f}ms: "
+            f"{stats.queries} queries in {stats.query_seconds * 1000:.1f}ms"
+        ]
+        for statement, (count, seconds) in breakdown[:10]:
+            lines.append(f"  {count}x {seconds * 1000:.1f}ms {statement}")
+        for platform, outcome, seconds in stats.outbound:
+            lines.append(f"  outbound {platform} {outcome} {seconds * 1000:.1f}ms")
+        logger.warning("\n".join(lines))
@@ -1,12 +1,25 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import auth, users, social_accounts, preferences, content, posts
+from .database import engine, async_engine
+from .routers import auth, users, social_accounts, preferences, content, posts, analytics, media
 from .config import settings
+from .cache import close_cache, invalidation_listener
+from .dispatcher import dispatcher
+from .outbox import reconciler
+from .hashing import password_hasher
+from .gemini_client import gemini_limiter
+from .media import media_processor
+from .social_media_integrations import close_publisher, get_publisher
+from .instrumentation import InstrumentationMiddleware, instrument_engine
+from .metrics import render_prometheus
+from .compression import CompressionMiddleware
+from .serialization import default_response_class
 
-Base.metadata.create_all(bind=engine)
+app = FastAPI(title="Smart Social Media Assistant API", default_response_class=default_response_class())
 
-app = FastAPI(title="Smart Social Media Assistant API")
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,7 +27,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
+# Added last so that request timings include compression
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(InstrumentationMiddleware)
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
@@ -22,10 +39,27 @@ app.include_router(social_accounts.router, prefix="/api")
 app.include_router(preferences.router, prefix="/api")
 app.include_router(content.router, prefix="/api")
 app.include_router(posts.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(media.router, prefix="/api")
 
 @app.on_event("startup")
 async def startup_event():
-    pass
+    get_publisher()
+    invalidation_listener.start()
+    if settings.dispatcher_enabled:
+        dispatcher.start()
+    if settings.outbox_reconciler_enabled:
+        reconciler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await dispatcher.stop()
+    await reconciler.stop()
+    await close_publisher()
+    await close_cache()
+    password_hasher.shutdown()
+    gemini_limiter.shutdown()
+    media_processor.shutdown()
 
 @app.get("/")
 def read_root():
@@ -34,3 +68,7 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
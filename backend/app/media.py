@@ -0,0 +1,318 @@
+"""Uploaded images and their derived renditions.
+
+Originals are stored content-addressed under MEDIA_STORAGE_PATH by their
+SHA-256, so the same file uploaded twice is stored once. Uploads are streamed
+to disk while they are parsed and hashed, never held in memory whole.
+
+Renditions (the JPEG Instagram is given) are rendered from the original on a
+process pool the first time they are asked for and kept on disk next to it.
+A file name always means the same bytes, so both are served as immutable.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from .config import settings
+from .metrics import register_provider
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Formats accepted for upload, by Pillow's name
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+# Instagram feed image limits
+INSTAGRAM_MIN_ASPECT = 4 / 5
+INSTAGRAM_MAX_ASPECT = 1.91
+INSTAGRAM_MIN_WIDTH = 320
+INSTAGRAM_MAX_WIDTH = 1440
+INSTAGRAM_MAX_BYTES = 8 * 1024 * 1024
+
+
+def original_path(digest: str) -> Path:
+    return Path(settings.media_storage_path) / "originals" / digest[:2] / digest
+
+
+def rendition_path(digest: str, rendition: str) -> Path:
+    return Path(settings.media_storage_path) / "renditions" / digest[:2] / f"{digest}-{rendition}.jpg"
+
+
+def media_url(digest: str, rendition: Optional[str] = None) -> str:
+    url = f"{settings.public_base_url.rstrip('/')}/api/media/files/{digest}"
+    return f"{url}/{rendition}.jpg" if rendition else url
+
+
+def replace_atomically(data: bytes, target: Path):
+    """Readers see the whole file or none of it"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=target.parent, suffix=".part")
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(data)
+        os.replace(temporary, target)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+# Runs on the process pool
+def probe_image(path: str) -> Tuple[str, int, int]:
+    """(format, width, height) of an image, raises ValueError for anything else"""
+    # Pillow is only loaded in the pool's processes, not by every API worker at startup
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image_format, size = image.format, image.size
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError("The upload is not a readable image") from None
+    if image_format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported image format {image_format}, upload JPEG, PNG, WebP or GIF")
+    return image_format, size[0], size[1]
+
+
+# Runs on the process pool
+def render_instagram(source: str, target: str):
+    """JPEG within Instagram's aspect ratio, width and size limits, center-cropped where needed"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    width, height = image.size
+    if width / height < INSTAGRAM_MIN_ASPECT:
+        cropped = round(width / INSTAGRAM_MIN_ASPECT)
+        top = (height - cropped) // 2
+        image = image.crop((0, top, width, top + cropped))
+    elif width / height > INSTAGRAM_MAX_ASPECT:
+        cropped = round(height * INSTAGRAM_MAX_ASPECT)
+        left = (width - cropped) // 2
+        image = image.crop((left, 0, left + cropped, height))
+
+    width, height = image.size
+    target_width = min(max(width, INSTAGRAM_MIN_WIDTH), INSTAGRAM_MAX_WIDTH)
+    if target_width != width:
+        image = image.resize((target_width, round(height * target_width / width)), Image.LANCZOS)
+
+    quality = 90
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+        if buffer.tell() <= INSTAGRAM_MAX_BYTES or quality <= 50:
+            break
+        quality -= 10
+    replace_atomically(buffer.getvalue(), Path(target))
+
+
+RENDITIONS = {"instagram": render_instagram}
+
+
+class MediaProcessor:
+    """Decodes and re-encodes images on a process pool, Pillow holds the GIL for most of that work.
+
+    Renditions are cached on disk; concurrent requests for one that does not exist
+    yet share a single render.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[Executor] = None
+        self._renders = SingleFlight()
+        self.probed = 0
+        self.rendered = 0
+        self.rendition_hits = 0
+        self.failures = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+
+    async def probe(self, path: Path) -> Tuple[str, int, int]:
+        self.probed += 1
+        return await self._run(probe_image, str(path))
+
+    async def _render(self, rendition: str, source: Path, target: Path):
+        try:
+            await self._run(RENDITIONS[rendition], str(source), str(target))
+        except Exception:
+            self.failures += 1
+            raise
+        self.rendered += 1
+
+    async def rendition(self, digest: str, rendition: str) -> Path:
+        """Path of the rendition, rendering it first if needed; FileNotFoundError without an original"""
+        target = rendition_path(digest, rendition)
+        if target.exists():
+            self.rendition_hits += 1
+            return target
+        source = original_path(digest)
+        if not source.exists():
+            raise FileNotFoundError(digest)
+        await self._renders.run(f"{digest}-{rendition}", lambda: self._render(rendition, source, target))
+        return target
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "probed": self.probed,
+            "rendered": self.rendered,
+            "rendition_hits": self.rendition_hits,
+            "failures": self.failures,
+            "renders": self._renders.stats(),
+        }
+
+
+media_processor = MediaProcessor(workers=settings.media_render_workers)
+register_provider("media", media_processor.stats)
+
+
+async def instagram_image_url(digest: str) -> Optional[str]:
+    """Public URL of the Instagram rendition, None if it cannot be rendered"""
+    try:
+        await media_processor.rendition(digest, "instagram")
+    except Exception:
+        logger.exception("Could not render the Instagram image for %s", digest)
+        return None
+    return media_url(digest, "instagram")
+
+
+class StoredUpload:
+    """An uploaded file moved into content-addressed storage"""
+
+    def __init__(self, digest: str, size_bytes: int, content_type: str, width: int, height: int,
+                 filename: Optional[str]):
+        self.digest = digest
+        self.size_bytes = size_bytes
+        self.content_type = content_type
+        self.width = width
+        self.height = height
+        self.filename = filename
+
+
+class _FilePart:
+    """Multipart parser callbacks collecting the bytes of one form field"""
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.headers: Dict[bytes, bytes] = {}
+        self._header_field: List[bytes] = []
+        self._header_value: List[bytes] = []
+        self.receiving = False
+        self.found = False
+        self.filename: Optional[str] = None
+        self.pending: List[bytes] = []
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self._header_field.append(data[start:end]),
+            "on_header_value": lambda data, start, end: self._header_value.append(data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_end(self):
+        self.headers[b"".join(self._header_field).lower()] = b"".join(self._header_value)
+        self._header_field, self._header_value = [], []
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        # Only the first part of the field is kept
+        if options.get(b"name") == self.field and b"filename" in options and not self.found:
+            self.receiving = self.found = True
+            self.filename = options[b"filename"].decode("utf-8", "replace") or None
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.receiving:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self.receiving = False
+
+
+async def receive_upload(request: Request, field: str = "file") -> StoredUpload:
+    """Stream the multipart field to storage while hashing it, and check that it is an image"""
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Upload the image as multipart/form-data")
+
+    incoming = Path(settings.media_storage_path) / "incoming"
+    await asyncio.to_thread(incoming.mkdir, parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=incoming)
+    part = _FilePart(field)
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if not part.pending:
+                    continue
+                data = b"".join(part.pending)
+                part.pending.clear()
+                size += len(data)
+                if size > settings.media_max_upload_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Images are limited to {settings.media_max_upload_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(data)
+                await asyncio.to_thread(handle.write, data)
+            parser.finalize()
+    except MultipartParseError as e:
+        os.unlink(temporary)
+        raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {e}")
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    try:
+        if not part.found:
+            raise HTTPException(status_code=400, detail=f"The upload has no \"{field}\" file")
+
+        try:
+            image_format, width, height = await media_processor.probe(Path(temporary))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+        hexdigest = digest.hexdigest()
+        target = original_path(hexdigest)
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        # An identical file already stored has the same name, replacing it changes nothing
+        await asyncio.to_thread(os.replace, temporary, target)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return StoredUpload(hexdigest, size, CONTENT_TYPES[image_format], width, height, part.filename)
@@ -0,0 +1,100 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+_providers: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_provider(name: str, provider: Callable[[], Dict]):
+    """Register a callable returning a snapshot of metrics for a component"""
+    _providers[name] = provider
+
+
+def collect() -> Dict[str, Dict]:
+    return {name: provider() for name, provider in _providers.items()}
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Per label set: bucket counts (last slot is +Inf), sum and count
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    bucket_labels = _format_labels(self.label_names, label_values, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {total:g}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+_instruments: List = []
+
+
+def histogram(name: str, help_text: str, label_names: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    instrument = Histogram(name, help_text, label_names, buckets)
+    _instruments.append(instrument)
+    return instrument
+
+
+def _flatten(prefix: str, snapshot: Dict) -> List[Tuple[str, float]]:
+    values = []
+    for key, value in snapshot.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            values.extend(_flatten(name, value))
+        elif isinstance(value, bool):
+            values.append((name, float(value)))
+        elif isinstance(value, (int, float)):
+            values.append((name, float(value)))
+    return values
+
+
+def render_prometheus() -> str:
+    """Text exposition of all instruments, component snapshots are rendered as gauges"""
+    lines: List[str] = []
+    for instrument in _instruments:
+        lines.extend(instrument.render())
+    for provider_name, snapshot in collect().items():
+        for name, value in _flatten(f"socialspark_{provider_name}", snapshot):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,51 @@
+"""Create or upgrade the database schema.
+
+Run once per deploy, before starting the API workers:
+
+    cd backend
+    python -m app.migrate
+
+Creates missing tables, adds nullable columns and indexes that were introduced
+after a table was first created, sets up full-text search (see search.py), and
+is safe to run repeatedly.
+"""
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from .database import Base, engine
+from .search import setup_search
+from . import models  # noqa: F401  registers the tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(bind: Engine):
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                logger.info("Adding column %s.%s", table.name, column.name)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def migrate(bind: Engine = engine):
+    add_missing_columns(bind)
+    Base.metadata.create_all(bind=bind)
+    # create_all skips tables that already exist, including their new indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    with bind.begin() as connection:
+        setup_search(connection)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
+    logger.info("Schema is up to date")
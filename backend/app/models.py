@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -59,5 +59,93 @@ class Post(Base):
     is_published = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    published_at = Column(DateTime, nullable=True)
+    # Lease held by the scheduled post dispatcher while it publishes the post
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    # SimHash of the content for near-duplicate detection, see near_duplicates.py
+    content_simhash = Column(BigInteger, nullable=True)
+    # Image attached to the post, Instagram publishes require one
+    media_id = Column(Integer, ForeignKey("media_assets.id", ondelete="SET NULL"), nullable=True)
     
     user = relationship("User", back_populates="posts")
+    publish_attempts = relationship("PublishAttempt", back_populates="post", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_posts_status_scheduled_time", "status", "scheduled_time"),
+        # Keyset pagination and filtering of a user's posts, see routers/posts.get_posts
+        Index("ix_posts_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_posts_user_status_created_id", "user_id", "status", "created_at", "id"),
+        Index("ix_posts_user_scheduled_time", "user_id", "scheduled_time"),
+        # Count and latest update of a user's posts for conditional GETs, see routers/posts.get_posts
+        Index("ix_posts_user_updated_at", "user_id", "updated_at"),
+    )
+
+class MediaAsset(Base):
+    """An uploaded image, its bytes are stored once per SHA-256, see media.py"""
+    __tablename__ = "media_assets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    content_type = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    filename = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # A user uploading the same file again gets the existing asset
+        Index("ux_media_assets_user_sha256", "user_id", "sha256", unique=True),
+        # Serving a file by its hash
+        Index("ix_media_assets_sha256", "sha256"),
+    )
+
+class PublishAttempt(Base):
+    """Outbox row for publishing one post to one platform"""
+    __tablename__ = "publish_attempts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(String, nullable=False)
+    # One key per post and platform, a leg that succeeded is never published again
+    idempotency_key = Column(String, unique=True, nullable=False)
+    state = Column(String, default="pending")
+    remote_post_id = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    published_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    post = relationship("Post", back_populates="publish_attempts")
+
+    __table_args__ = (
+        Index("ix_publish_attempts_post_id", "post_id"),
+        # The reconciler scans for pending legs and in-progress legs whose lease expired
+        Index("ix_publish_attempts_state_next_attempt_at", "state", "next_attempt_at"),
+    )
+
+class PostRollup(Base):
+    """Number of a user's posts created on a day, by status and platform, see analytics.py"""
+    __tablename__ = "post_rollups"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(String, primary_key=True)
+    # "*" counts every post once, the other rows count posts listing the platform
+    platform = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class PublishRollup(Base):
+    """Number of a user's publish legs that ended in an outcome, by the day the leg was created"""
+    __tablename__ = "publish_rollups"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    platform = Column(String, primary_key=True)
+    outcome = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
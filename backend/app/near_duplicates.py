@@ -0,0 +1,297 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .database import AsyncSessionLocal
+from .metrics import register_provider
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+SIMHASH_BITS = 64
+_TOKEN_PATTERN = re.compile(r"[#@]?\w+")
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word bigrams of the normalized text.
+
+    Texts that share most of their bigrams get fingerprints a few bits apart,
+    so similarity is 1 - hamming distance / 64.
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    features = [f"{first} {second}" for first, second in zip(tokens, tokens[1:])] or tokens
+    if not features:
+        return 0
+
+    counts = [0] * SIMHASH_BITS
+    for feature in features:
+        for index, bit in enumerate(format(_feature_hash(feature), "064b")):
+            if bit == "1":
+                counts[index] += 1
+    half = len(features) / 2
+    return int("".join("1" if count > half else "0" for count in counts), 2)
+
+
+def to_signed(fingerprint: int) -> int:
+    """Stored form of a fingerprint, BIGINT columns are signed"""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def to_unsigned(stored: int) -> int:
+    return stored + (1 << 64) if stored < 0 else stored
+
+
+def similarity(first: int, second: int) -> float:
+    return 1 - bin(first ^ second).count("1") / SIMHASH_BITS
+
+
+def max_distance(threshold: float) -> int:
+    return max(0, min(SIMHASH_BITS - 1, int((1 - threshold) * SIMHASH_BITS)))
+
+
+def band_ranges(distance: int) -> List[Tuple[int, int]]:
+    """Split the 64 bits into distance + 1 bands.
+
+    Two fingerprints at most `distance` bits apart agree exactly on at least
+    one band, so only posts sharing a band bucket need comparing.
+    """
+    count = distance + 1
+    width, extra = divmod(SIMHASH_BITS, count)
+    ranges, start = [], 0
+    for index in range(count):
+        size = width + (1 if index < extra else 0)
+        ranges.append((start, size))
+        start += size
+    return ranges
+
+
+class NearDuplicateMatch:
+    def __init__(self, post_id: int, similarity: float):
+        self.post_id = post_id
+        self.similarity = similarity
+
+
+class UserIndex:
+    """Fingerprints of one user's posts, bucketed by band"""
+
+    def __init__(self, bands: List[Tuple[int, int]]):
+        self.bands = bands
+        self.loaded_at = time.monotonic()
+        self.fingerprints: Dict[int, Tuple[int, bool]] = {}
+        self.buckets: Dict[Tuple[int, int], Set[int]] = {}
+
+    def _keys(self, fingerprint: int):
+        for index, (start, size) in enumerate(self.bands):
+            yield index, (fingerprint >> start) & ((1 << size) - 1)
+
+    def add(self, post_id: int, fingerprint: int, published: bool = False):
+        self.remove(post_id)
+        self.fingerprints[post_id] = (fingerprint, published)
+        for key in self._keys(fingerprint):
+            self.buckets.setdefault(key, set()).add(post_id)
+
+    def remove(self, post_id: int):
+        entry = self.fingerprints.pop(post_id, None)
+        if entry is None:
+            return
+        for key in self._keys(entry[0]):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(post_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def mark_published(self, post_id: int):
+        entry = self.fingerprints.get(post_id)
+        if entry is not None:
+            self.fingerprints[post_id] = (entry[0], True)
+
+    def nearest(self, fingerprint: int, threshold: float, exclude_post_id: Optional[int] = None,
+                published_only: bool = False) -> Optional[NearDuplicateMatch]:
+        candidates: Set[int] = set()
+        for key in self._keys(fingerprint):
+            candidates |= self.buckets.get(key, set())
+        candidates.discard(exclude_post_id)
+
+        best: Optional[NearDuplicateMatch] = None
+        for post_id in candidates:
+            other, published = self.fingerprints[post_id]
+            if published_only and not published:
+                continue
+            score = similarity(fingerprint, other)
+            if score >= threshold and (best is None or score > best.similarity):
+                best = NearDuplicateMatch(post_id, score)
+        return best
+
+
+class NearDuplicateIndex:
+    """Per-user SimHash index of post contents.
+
+    A user's index is built from the stored fingerprints on first use and then
+    kept up to date by the post routes. It is rebuilt after
+    near_duplicate_index_ttl_seconds so that writes made by other workers (or
+    the dispatcher) are picked up; the least recently used users are evicted
+    beyond near_duplicate_index_max_users.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._users: "OrderedDict[int, UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.backfilled = 0
+        self.checks = 0
+        self.matches = 0
+        self.check_seconds = 0.0
+
+    def _cached(self, user_id: int) -> Optional[UserIndex]:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return None
+            if time.monotonic() - index.loaded_at > self.ttl_seconds \
+                    or index.bands != band_ranges(max_distance(settings.near_duplicate_threshold)):
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return index
+
+    async def _user_index(self, db: AsyncSession, user_id: int) -> UserIndex:
+        index = self._cached(user_id)
+        if index is not None:
+            return index
+
+        index = UserIndex(band_ranges(max_distance(settings.near_duplicate_threshold)))
+        result = await db.execute(
+            select(Post.id, Post.content_simhash, Post.is_published)
+            .where(Post.user_id == user_id, Post.content_simhash.is_not(None))
+        )
+        for post_id, stored, published in result.all():
+            index.add(post_id, to_unsigned(stored), bool(published))
+
+        # Rows written before fingerprints were stored are hashed once and backfilled
+        result = await db.execute(
+            select(Post.id, Post.content, Post.is_published)
+            .where(Post.user_id == user_id, Post.content_simhash.is_(None))
+        )
+        backfill = []
+        for post_id, content, published in result.all():
+            fingerprint = simhash(content)
+            index.add(post_id, fingerprint, bool(published))
+            backfill.append({"post_id": post_id, "fingerprint": to_signed(fingerprint)})
+        if backfill:
+            await self._backfill(backfill)
+        self.loads += 1
+
+        with self._lock:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    async def _backfill(self, rows: List[Dict]):
+        # In a session of its own, the caller's transaction may still be rolled back
+        table = Post.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("post_id"), table.c.content_simhash.is_(None))
+            # Assigning updated_at to itself keeps its onupdate from firing, the post did not change
+            .values(content_simhash=bindparam("fingerprint"), updated_at=table.c.updated_at)
+        )
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(statement, rows)
+                await session.commit()
+        except SQLAlchemyError:
+            # The index already has the fingerprints, the next rebuild tries again
+            logger.warning("Could not backfill %d post fingerprints", len(rows), exc_info=True)
+            return
+        self.backfilled += len(rows)
+
+    async def check(self, db: AsyncSession, user_id: int, fingerprint: int, exclude_post_id: Optional[int] = None,
+                    published_only: bool = False) -> Optional[NearDuplicateMatch]:
+        """Most similar post of the user at or above the configured threshold, if any"""
+        index = await self._user_index(db, user_id)
+        started = time.perf_counter()
+        match = index.nearest(fingerprint, settings.near_duplicate_threshold, exclude_post_id, published_only)
+        self.check_seconds += time.perf_counter() - started
+        self.checks += 1
+        if match is not None:
+            self.matches += 1
+        return match
+
+    def add(self, user_id: int, post_id: int, fingerprint: int, published: bool = False):
+        index = self._cached(user_id)
+        if index is not None:
+            index.add(post_id, fingerprint, published)
+
+    def remove(self, user_id: int, post_ids):
+        index = self._cached(user_id)
+        if index is not None:
+            for post_id in post_ids:
+                index.remove(post_id)
+
+    def mark_published(self, user_id: int, post_id: int):
+        index = self._cached(user_id)
+        if index is not None:
+            index.mark_published(post_id)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            users = len(self._users)
+            posts = sum(len(index.fingerprints) for index in self._users.values())
+        return {
+            "users": users,
+            "posts": posts,
+            "loads": self.loads,
+            "backfilled": self.backfilled,
+            "checks": self.checks,
+            "matches": self.matches,
+            "check_seconds_avg": self.check_seconds / self.checks if self.checks else None,
+        }
+
+
+def near_duplicate_headers(match: Optional[NearDuplicateMatch]) -> Dict[str, str]:
+    if match is None:
+        return {}
+    return {"X-Near-Duplicate-Of": str(match.post_id), "X-Near-Duplicate-Similarity": f"{match.similarity:.3f}"}
+
+
+async def screen_near_duplicate(db: AsyncSession, user_id: int, fingerprint: int, subject: str = "Post",
+                                exclude_post_id: Optional[int] = None,
+                                published_only: bool = False) -> Optional[NearDuplicateMatch]:
+    """Apply NEAR_DUPLICATE_ACTION: "off" skips the check, "block" raises 409, "flag" returns the match"""
+    if settings.near_duplicate_action == "off":
+        return None
+    match = await near_duplicate_index.check(db, user_id, fingerprint, exclude_post_id, published_only)
+    if match is not None and settings.near_duplicate_action == "block":
+        raise HTTPException(
+            status_code=409,
+            detail=f"{subject} is a near duplicate of post {match.post_id} ({match.similarity:.0%} similar)",
+            headers=near_duplicate_headers(match)
+        )
+    return match
+
+
+near_duplicate_index = NearDuplicateIndex(
+    settings.near_duplicate_index_max_users, settings.near_duplicate_index_ttl_seconds
+)
+register_provider("near_duplicates", near_duplicate_index.stats)
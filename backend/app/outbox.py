@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import and_, or_, select
+from .config import settings
+from .database import AsyncSessionLocal
+from .metrics import register_provider
+from .models import Post, PublishAttempt
+from .publishing import apply_publishing_results, publish_post_attempts
+
+logger = logging.getLogger(__name__)
+
+
+class PublishReconciler:
+    """Drains the publish outbox.
+
+    Picks up legs left pending (rate limited) and in-progress legs whose lease
+    expired, and publishes them with many posts in flight at once. Each leg is
+    claimed with a conditional update, so the reconciler can run next to the API,
+    the dispatcher and other reconcilers without publishing a leg twice.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, batch_size: Optional[int] = None,
+                 concurrency: Optional[int] = None, interval: Optional[float] = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.outbox_reconciler_batch_size
+        self.concurrency = concurrency or settings.outbox_reconciler_concurrency
+        self.interval = interval or settings.outbox_reconciler_interval_seconds
+        self.runs = 0
+        self.posts = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.still_pending = 0
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def due_post_ids(self) -> List[int]:
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(PublishAttempt.post_id).where(
+                    or_(
+                        and_(
+                            PublishAttempt.state == "pending",
+                            or_(PublishAttempt.next_attempt_at.is_(None), PublishAttempt.next_attempt_at <= now),
+                        ),
+                        and_(PublishAttempt.state == "in_progress", PublishAttempt.lease_expires_at < now),
+                    )
+                ).distinct().limit(self.batch_size)
+            )
+            return list(result.scalars())
+
+    async def reconcile_post(self, post_id: int):
+        async with self.session_factory() as db:
+            post = await db.get(Post, post_id)
+            if not post:
+                return
+            attempts, publishing_results = await publish_post_attempts(db, post, states=("pending",))
+
+            for attempt, result in zip(attempts, publishing_results):
+                if result.get("skipped"):
+                    continue
+                if attempt.state == "succeeded":
+                    self.succeeded += 1
+                elif attempt.state == "failed":
+                    self.failed += 1
+                elif attempt.state == "pending":
+                    self.still_pending += 1
+
+            await db.refresh(post)
+            leased = post.status == "publishing" and post.lease_expires_at and post.lease_expires_at > datetime.utcnow()
+            if not leased:
+                # A dispatcher holding the post sets its status itself
+                await apply_publishing_results(db, post, attempts, requeue_rate_limited=post.status == "scheduled")
+            await db.commit()
+
+    async def run_once(self) -> int:
+        """Reconcile one batch of posts with due legs, returns the number of posts"""
+        self.runs += 1
+        post_ids = await self.due_post_ids()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def reconcile(post_id: int):
+            async with semaphore:
+                await self.reconcile_post(post_id)
+
+        outcomes = await asyncio.gather(*(reconcile(post_id) for post_id in post_ids), return_exceptions=True)
+        for post_id, outcome in zip(post_ids, outcomes):
+            if isinstance(outcome, Exception):
+                self.errors += 1
+                logger.error("Failed to reconcile publish attempts of post %s: %s", post_id, outcome)
+        self.posts += len(post_ids)
+        return len(post_ids)
+
+    async def run_forever(self):
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                reconciled = await self.run_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Publish outbox reconciliation failed")
+                reconciled = 0
+            if reconciled >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "posts": self.posts,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "still_pending": self.still_pending,
+            "errors": self.errors,
+        }
+
+
+reconciler = PublishReconciler()
+register_provider("outbox", reconciler.stats)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(reconciler.run_once())
@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .analytics import post_key, record_post_change, record_publish_changes
+from .config import settings
+from .media import instagram_image_url
+from .models import MediaAsset, Post, PublishAttempt, SocialAccount
+from .near_duplicates import near_duplicate_index
+from .social_media_integrations import get_publisher, platform_key
+
+
+def idempotency_key(post_id: int, platform: str) -> str:
+    return f"post-{post_id}-{platform_key(platform)}"
+
+
+async def get_user_tokens(db: AsyncSession, user_id: int) -> Dict[str, str]:
+    """Build the per-platform access token mapping from a user's connected accounts"""
+    result = await db.execute(
+        select(SocialAccount).where(
+            SocialAccount.user_id == user_id,
+            SocialAccount.is_connected == True
+        )
+    )
+    social_accounts = result.scalars().all()
+
+    user_tokens: Dict[str, str] = {}
+    for account in social_accounts:
+        platform_lower = account.platform.lower()
+        if account.access_token:
+            if platform_lower in ['threads']:
+                user_tokens['threads'] = account.access_token
+            elif platform_lower in ['instagram']:
+                user_tokens['instagram'] = account.access_token
+    return user_tokens
+
+
+async def ensure_publish_attempts(db: AsyncSession, post: Post) -> List[PublishAttempt]:
+    """Create the missing outbox rows for the post's platforms, returns the rows of its current platforms"""
+    platforms = list(dict.fromkeys(platform_key(platform) for platform in post.platforms or []))
+    if not platforms:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    rows = [
+        {"post_id": post.id, "platform": platform, "idempotency_key": idempotency_key(post.id, platform),
+         "state": "pending", "attempts": 0}
+        for platform in platforms
+    ]
+    # Concurrent publishers may create the same rows, the idempotency key keeps one of them
+    if dialect == "postgresql":
+        statement = postgresql_insert(PublishAttempt).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    elif dialect == "sqlite":
+        statement = sqlite_insert(PublishAttempt).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    else:
+        existing = set((await db.execute(
+            select(PublishAttempt.platform).where(PublishAttempt.post_id == post.id)
+        )).scalars())
+        rows = [row for row in rows if row["platform"] not in existing]
+        statement = insert(PublishAttempt)
+    if rows:
+        await db.execute(statement, rows)
+
+    result = await db.execute(
+        select(PublishAttempt).where(
+            PublishAttempt.post_id == post.id,
+            PublishAttempt.platform.in_(platforms)
+        )
+    )
+    attempts = {attempt.platform: attempt for attempt in result.scalars()}
+    return [attempts[platform] for platform in platforms]
+
+
+async def claim_publish_attempts(db: AsyncSession, attempts: List[PublishAttempt],
+                                 states: Iterable[str]) -> List[PublishAttempt]:
+    """Move the attempts in one of the given states to "in_progress" under a lease.
+
+    The claim is a single conditional UPDATE, so of several publishers (the API,
+    the dispatcher, the reconciler) only one takes each leg. In-progress legs whose
+    lease expired are claimable again, their publisher died before recording a result.
+    """
+    if not attempts:
+        return []
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(PublishAttempt)
+        .where(
+            PublishAttempt.id.in_([attempt.id for attempt in attempts]),
+            or_(
+                and_(
+                    PublishAttempt.state.in_(list(states)),
+                    or_(PublishAttempt.next_attempt_at.is_(None), PublishAttempt.next_attempt_at <= now),
+                ),
+                and_(PublishAttempt.state == "in_progress", PublishAttempt.lease_expires_at < now),
+            )
+        )
+        .values(
+            state="in_progress",
+            attempts=PublishAttempt.attempts + 1,
+            lease_expires_at=now + timedelta(seconds=settings.publish_attempt_lease_seconds),
+            updated_at=now,
+        )
+        .returning(PublishAttempt.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed_ids = set(result.scalars())
+    # Reload the rows so the session sees the claim
+    await db.execute(
+        select(PublishAttempt)
+        .where(PublishAttempt.id.in_([attempt.id for attempt in attempts]))
+        .execution_options(populate_existing=True)
+    )
+    return [attempt for attempt in attempts if attempt.id in claimed_ids]
+
+
+def record_attempt_result(attempt: PublishAttempt, result: Dict):
+    now = datetime.utcnow()
+    if result.get("success"):
+        attempt.state = "succeeded"
+        attempt.remote_post_id = str(result["post_id"]) if result.get("post_id") is not None else None
+        attempt.last_error = None
+        attempt.published_at = now
+    elif result.get("rate_limited"):
+        # Left for the reconciler once the platform's window has had time to reset
+        attempt.state = "pending"
+        attempt.last_error = result.get("error") or result.get("message")
+        attempt.next_attempt_at = now + timedelta(seconds=settings.publish_rate_limit_backoff_seconds * 2 ** min(attempt.attempts, 10))
+    elif result.get("timed_out"):
+        # The post may have gone out after all, calling it failed invites a retry that posts it twice.
+        # The leg stays in progress under a fresh lease and the reconciler takes it over once that expires.
+        attempt.last_error = result.get("message") or result.get("error")
+    else:
+        attempt.state = "failed"
+        attempt.last_error = result.get("error") or result.get("message")
+    attempt.lease_expires_at = (
+        now + timedelta(seconds=settings.publish_attempt_lease_seconds) if attempt.state == "in_progress" else None
+    )
+    attempt.updated_at = now
+
+
+def attempt_result(attempt: PublishAttempt) -> Dict:
+    """Result entry for a leg that was not published in this call"""
+    messages = {
+        "succeeded": "Already published",
+        "pending": "Waiting for the platform rate limit to reset",
+        "in_progress": "Publishing in progress",
+        "failed": attempt.last_error or "Publishing failed",
+    }
+    return {
+        "success": attempt.state == "succeeded",
+        "platform": attempt.platform,
+        "post_id": attempt.remote_post_id,
+        "skipped": True,
+        "message": messages.get(attempt.state, attempt.state),
+    }
+
+
+async def publish_post_attempts(db: AsyncSession, post: Post,
+                                states: Iterable[str] = ("pending", "failed")) -> Tuple[List[PublishAttempt], List[Dict]]:
+    """Publish the post's legs in the given states and record each platform's outcome.
+
+    Claimed legs are committed before any platform is called, so a crash leaves
+    them in progress for the reconciler instead of losing track of them. Returns
+    all of the post's attempts and one result per platform, in platform order.
+    """
+    attempts = await ensure_publish_attempts(db, post)
+    previous_states = {attempt.id: attempt.state for attempt in attempts}
+    claimed = await claim_publish_attempts(db, attempts, states)
+    # A failed leg that is retried leaves the failed count until it has a new outcome
+    await record_publish_changes(db, [
+        (post.user_id, attempt, previous_states[attempt.id], attempt.state) for attempt in claimed
+    ])
+    user_tokens = await get_user_tokens(db, post.user_id) if claimed else {}
+    content = post.content
+    media_digest = None
+    if post.media_id is not None and any(attempt.platform == "instagram" for attempt in claimed):
+        media_digest = (await db.execute(
+            select(MediaAsset.sha256).where(MediaAsset.id == post.media_id)
+        )).scalar_one_or_none()
+    # Do not hold a connection while waiting on the platforms
+    await db.commit()
+
+    publishing_results: Dict[int, Dict] = {}
+    if claimed:
+        # Instagram fetches the image from us, it gets a rendition within its size limits
+        image_url = await instagram_image_url(media_digest) if media_digest else None
+        results = await get_publisher().publish_to_platforms(
+            content=content,
+            platforms=[attempt.platform for attempt in claimed],
+            user_tokens=user_tokens if user_tokens else None,
+            image_url=image_url
+        )
+        for attempt, result in zip(claimed, results):
+            record_attempt_result(attempt, result)
+            publishing_results[attempt.id] = result
+        await record_publish_changes(db, [(post.user_id, attempt, "in_progress", attempt.state) for attempt in claimed])
+
+    return attempts, [publishing_results.get(attempt.id) or attempt_result(attempt) for attempt in attempts]
+
+
+async def apply_publishing_results(db: AsyncSession, post: Post, attempts: List[PublishAttempt],
+                                   requeue_rate_limited: bool = False) -> bool:
+    """Update the post status from its publish attempts, returns whether any platform succeeded.
+
+    With requeue_rate_limited, a post whose legs are all waiting on rate limits goes back
+    to "scheduled" so the dispatcher picks it up again instead of marking it failed.
+    While a leg is still in progress under another publisher's lease, nothing has failed
+    yet and the post is left as it is for that publisher to settle.
+    """
+    before = post_key(post)
+    any_success = any(attempt.state == "succeeded" for attempt in attempts)
+    only_pending = bool(attempts) and all(attempt.state == "pending" for attempt in attempts)
+
+    if not any_success and any(attempt.state == "in_progress" for attempt in attempts):
+        return False
+    if any_success:
+        post.is_published = True
+        post.status = "published"
+        post.published_at = post.published_at or datetime.utcnow()
+        near_duplicate_index.mark_published(post.user_id, post.id)
+    elif requeue_rate_limited and only_pending:
+        post.status = "scheduled"
+        # Not due again before its first leg may be retried, or every poll would claim it for nothing
+        retry_at = min((attempt.next_attempt_at for attempt in attempts if attempt.next_attempt_at), default=None)
+        if retry_at and (post.scheduled_time is None or retry_at > post.scheduled_time):
+            post.scheduled_time = retry_at
+    else:
+        post.status = "failed"
+    post.lease_owner = None
+    post.lease_expires_at = None
+    await record_post_change(db, before, post_key(post))
+    return any_success
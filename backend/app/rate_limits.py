@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from typing import Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from .config import settings
+from .metrics import register_provider
+
+logger = logging.getLogger(__name__)
+
+
+def finite_number(value) -> Optional[float]:
+    """The value as a finite float, None for anything a platform should not have sent"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def account_key(token: Optional[str]) -> str:
+    """Stable, non-reversible key for a per-user access token"""
+    if not token:
+        return "app"
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+class PlatformBudget:
+    """Token bucket for one platform account, corrected by what the platform reports.
+
+    The local bucket paces calls before anything is known. Once responses carry
+    rate limit headers, the reported remaining calls and reset time take over,
+    and a 429 or an exhausted Meta usage percentage blocks the account until
+    the platform says it may call again.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.blocked_until = 0.0
+        self.queued = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_seconds(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        waits = [self.blocked_until - now]
+        if self.remaining is not None and self.remaining <= 0 and self.reset_at is not None:
+            waits.append(self.reset_at - time.time())
+        if self.tokens < 1:
+            waits.append((1 - self.tokens) / self.refill_per_second)
+        return max(waits + [0.0])
+
+    def consume(self):
+        self.tokens -= 1
+        if self.remaining is not None:
+            self.remaining -= 1
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimitScheduler:
+    """Queues outbound publish calls per (platform, account) and retries rate limited ones with jittered backoff"""
+
+    def __init__(self):
+        self._budgets: Dict[Tuple[str, str], PlatformBudget] = {}
+
+    def _budget(self, platform: str, account: str) -> PlatformBudget:
+        budget = self._budgets.get((platform, account))
+        if budget is None:
+            # setdefault keeps creation atomic, X responses are observed from the publish threads
+            budget = self._budgets.setdefault((platform, account), PlatformBudget(
+                settings.publish_rate_limit_burst, settings.publish_rate_limit_per_second
+            ))
+        return budget
+
+    def observe(self, platform: str, account: str, status_code: int, headers: Mapping[str, str]):
+        """Learn limits from a platform response.
+
+        Never raises: it runs after the platform accepted or refused the post, so a
+        header that does not parse is ignored rather than turning the outcome into
+        an error (and a successful post into a retry that posts twice).
+        """
+        budget = self._budget(platform, account)
+        remaining = finite_number(headers.get("x-rate-limit-remaining"))
+        reset = finite_number(headers.get("x-rate-limit-reset"))
+        if remaining is not None and reset is not None:
+            budget.remaining = int(remaining)
+            budget.reset_at = reset
+
+        # Meta reports usage as percentages of the allowance in JSON headers
+        for header in ("x-app-usage", "x-business-use-case-usage"):
+            usage = headers.get(header)
+            if usage:
+                self._observe_meta_usage(budget, usage)
+
+        if status_code == 429:
+            budget.rate_limited += 1
+            retry_after = headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                budget.block_for(float(retry_after))
+            elif budget.reset_at is not None:
+                budget.block_for(budget.reset_at - time.time())
+
+    def _observe_meta_usage(self, budget: PlatformBudget, raw_usage: str):
+        try:
+            usage = json.loads(raw_usage)
+        except ValueError:
+            return
+        if not isinstance(usage, dict):
+            return
+        # x-business-use-case-usage nests a list of usage objects per business id
+        entries = [usage] if "call_count" in usage else [
+            entry for entries in usage.values() if isinstance(entries, list) for entry in entries
+        ]
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            highest = max(finite_number(entry.get(key)) or 0 for key in ("call_count", "total_time", "total_cputime"))
+            if highest >= settings.meta_usage_block_percent:
+                minutes = finite_number(entry.get("estimated_time_to_regain_access")) or 0
+                budget.block_for(max(minutes * 60, settings.publish_rate_limit_backoff_seconds))
+
+    async def acquire(self, platform: str, account: str, deadline: float):
+        """Wait for the account's turn, raises TimeoutError if that would pass the deadline"""
+        budget = self._budget(platform, account)
+        budget.queued += 1
+        try:
+            async with budget.lock:
+                while True:
+                    delay = budget.wait_seconds()
+                    if delay <= 0:
+                        budget.consume()
+                        return
+                    if time.monotonic() + delay > deadline:
+                        raise TimeoutError
+                    await asyncio.sleep(delay)
+        finally:
+            budget.queued -= 1
+
+    async def run(self, platform: str, platform_name: str, account: str, call: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Run a publish call under the account's budget, retrying while the platform rate limits it"""
+        budget = self._budget(platform, account)
+        deadline = time.monotonic() + settings.publish_rate_limit_max_wait_seconds
+        attempt = 0
+        while True:
+            try:
+                await self.acquire(platform, account, deadline)
+            except TimeoutError:
+                return self._gave_up(platform_name)
+
+            result = await call()
+            if not result.get("rate_limited") or attempt >= settings.publish_rate_limit_max_retries:
+                return result
+
+            attempt += 1
+            budget.retries += 1
+            backoff = settings.publish_rate_limit_backoff_seconds * 2 ** (attempt - 1)
+            budget.block_for(backoff * random.uniform(0.5, 1.5))
+            logger.info("%s rate limited account %s, retry %d", platform, account, attempt)
+
+    def _gave_up(self, platform_name: str) -> Dict:
+        return {
+            "success": False,
+            "platform": platform_name,
+            "rate_limited": True,
+            "error": "Rate limited",
+            "message": f"{platform_name} rate limit did not reset within {settings.publish_rate_limit_max_wait_seconds:g} seconds"
+        }
+
+    def stats(self) -> Dict:
+        platforms: Dict[str, Dict] = {}
+        for (platform, _), budget in list(self._budgets.items()):
+            entry = platforms.setdefault(platform, {
+                "accounts": 0, "queued": 0, "blocked_accounts": 0, "rate_limited": 0, "retries": 0,
+                "min_remaining": None,
+            })
+            entry["accounts"] += 1
+            entry["queued"] += budget.queued
+            entry["blocked_accounts"] += budget.wait_seconds() > 0
+            entry["rate_limited"] += budget.rate_limited
+            entry["retries"] += budget.retries
+            if budget.remaining is not None:
+                current = entry["min_remaining"]
+                entry["min_remaining"] = budget.remaining if current is None else min(current, budget.remaining)
+        return platforms
+
+
+rate_limiter = RateLimitScheduler()
+register_provider("rate_limits", rate_limiter.stats)
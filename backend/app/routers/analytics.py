@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Literal
+from datetime import date, datetime, timedelta
+from ..database import get_db
+from ..models import User, PostRollup, PublishRollup
+from ..schemas import AnalyticsPeriod, AnalyticsSummary, PlatformPublishStats
+from ..auth import get_current_active_user
+from ..analytics import ALL_PLATFORMS
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+def period_start(day: date, interval: str) -> date:
+    """Weeks start on Monday"""
+    return day - timedelta(days=day.weekday()) if interval == "week" else day
+
+@router.get("/summary", response_model=AnalyticsSummary)
+async def get_analytics_summary(
+    days: int = Query(30, ge=1, le=366),
+    interval: Literal["day", "week"] = "day",
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Posts by status and platform, posts created per day or week over the last `days` days,
+    and publish success rate per platform. Reads only the rollup tables, see analytics.py.
+    """
+    totals = await db.execute(
+        select(PostRollup.status, PostRollup.platform, func.sum(PostRollup.count))
+        .where(PostRollup.user_id == current_user.id)
+        .group_by(PostRollup.status, PostRollup.platform)
+    )
+    by_status: Dict[str, int] = {}
+    by_platform: Dict[str, int] = {}
+    for status, platform, count in totals:
+        if not count:
+            continue
+        if platform == ALL_PLATFORMS:
+            by_status[status] = count
+        else:
+            by_platform[platform] = by_platform.get(platform, 0) + count
+    
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+    periods: Dict[date, AnalyticsPeriod] = {}
+    start = period_start(since, interval)
+    while start <= today:
+        periods[start] = AnalyticsPeriod(start=start, posts=0, by_status={})
+        start += timedelta(days=7 if interval == "week" else 1)
+    
+    daily = await db.execute(
+        select(PostRollup.day, PostRollup.status, func.sum(PostRollup.count))
+        .where(
+            PostRollup.user_id == current_user.id,
+            PostRollup.platform == ALL_PLATFORMS,
+            PostRollup.day >= since
+        )
+        .group_by(PostRollup.day, PostRollup.status)
+    )
+    for day, status, count in daily:
+        period = periods.get(period_start(day, interval))
+        if not count or period is None:
+            continue
+        period.posts += count
+        period.by_status[status] = period.by_status.get(status, 0) + count
+    
+    outcomes = await db.execute(
+        select(PublishRollup.platform, PublishRollup.outcome, func.sum(PublishRollup.count))
+        .where(PublishRollup.user_id == current_user.id)
+        .group_by(PublishRollup.platform, PublishRollup.outcome)
+    )
+    publishing: Dict[str, Dict[str, int]] = {}
+    for platform, outcome, count in outcomes:
+        publishing.setdefault(platform, {"succeeded": 0, "failed": 0})[outcome] = count or 0
+    
+    return AnalyticsSummary(
+        total_posts=sum(by_status.values()),
+        by_status=by_status,
+        by_platform=by_platform,
+        interval=interval,
+        timeline=list(periods.values()),
+        publishing=[
+            PlatformPublishStats(
+                platform=platform,
+                succeeded=counts["succeeded"],
+                failed=counts["failed"],
+                success_rate=counts["succeeded"] / (counts["succeeded"] + counts["failed"])
+                if counts["succeeded"] + counts["failed"] else None
+            )
+            for platform, counts in sorted(publishing.items())
+        ]
+    )
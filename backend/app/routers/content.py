@@ -1,48 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import google.generativeai as genai
-from ..database import get_db
-from ..models import User, ContentPreference
-from ..schemas import GenerateContentRequest, GenerateContentResponse
+from typing import List, Optional
+import asyncio
+import json
+from ..database import AsyncSessionLocal, get_db
+from ..models import User, ContentPreference, Post
+from ..schemas import (
+    GenerateContentRequest, GenerateContentResponse, GenerateBatchRequest,
+    GenerateBatchResult, GenerateBatchSummary
+)
+from ..analytics import post_key, record_post_changes
 from ..auth import get_current_active_user
 from ..config import settings
+from ..generation_cache import generation_cache, generation_cache_key, generation_flights
+from ..gemini_client import GEMINI_MODEL_NAME, gemini_limiter, initialize_gemini, generate, stream_text
+from ..near_duplicates import near_duplicate_index, screen_near_duplicate, simhash, to_signed, to_unsigned
+from .preferences import get_cached_preferences
 
 router = APIRouter(prefix="/content", tags=["content generation"])
 
-def initialize_gemini():
-    if settings.gemini_api_key:
-        genai.configure(api_key=settings.gemini_api_key)
-        return genai.GenerativeModel('gemini-2.5-flash')
-    return None
-
-@router.post("/generate", response_model=GenerateContentResponse)
-async def generate_content(
-    request: GenerateContentRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    preferences = db.query(ContentPreference).filter(
-        ContentPreference.user_id == current_user.id
-    ).first()
-    
-    if not preferences:
-        raise HTTPException(status_code=404, detail="Please set your content preferences first")
-    
-    model = initialize_gemini()
-    if not model:
-        raise HTTPException(status_code=500, detail="Gemini API key not configured. Please add GEMINI_API_KEY to your environment.")
-    
-    topic = request.topic or (preferences.topics[0] if preferences.topics else "general topic")
-    platform = request.platform or "social media"
-    
+def build_content_prompt(preferences: ContentPreference, topic: str, platform: str) -> str:
     length_instructions = {
         "short": "Keep it under 100 characters",
         "medium": "Keep it between 100-200 characters",
         "long": "Keep it between 200-280 characters"
     }
     
-    prompt = f"""Generate a {preferences.posting_style} {platform} post about {topic}.
+    return f"""Generate a {preferences.posting_style} {platform} post about {topic}.
 
 Style Guidelines:
 - Tone: {preferences.tone}
@@ -57,26 +43,326 @@ Additional requirements:
 
 Generate only the post content without any preamble or explanation."""
 
-    if request.custom_prompt:
-        prompt = request.custom_prompt
-    
+def build_hashtag_prompt(platform: str, topic: str) -> str:
+    return f"Generate 3-5 relevant hashtags for this {platform} post about {topic}. Return only the hashtags separated by spaces, starting with #."
+
+def build_structured_prompt(prompt: str, platform: str, topic: str) -> str:
+    """Wrap the post prompt so the post and its hashtags come back from a single call"""
+    return f"""{prompt}
+
+Respond with a JSON object with exactly two keys:
+- "content": the post text described above
+- "hashtags": a list of 3-5 relevant hashtags for this {platform} post about {topic}, each starting with #"""
+
+def parse_hashtags(hashtags_text: str) -> List[str]:
+    return [tag.strip() for tag in hashtags_text.split() if tag.startswith('#')]
+
+def fallback_hashtags(preferences: ContentPreference) -> List[str]:
+    return [f"#{tag}" if not tag.startswith('#') else tag for tag in (preferences.hashtags or [])[:3]]
+
+def parse_structured_response(text: str) -> Optional[dict]:
     try:
-        response = model.generate_content(prompt)
-        content = response.text.strip()
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("content"), str):
+        return None
+    hashtags = data.get("hashtags") or []
+    if isinstance(hashtags, str):
+        hashtags = hashtags.split()
+    return {
+        "content": data["content"].strip(),
+        "hashtags": [str(tag).strip() for tag in hashtags if str(tag).strip().startswith('#')],
+    }
+
+def cache_relevant_preferences(preferences: ContentPreference) -> dict:
+    return {
+        "posting_style": preferences.posting_style,
+        "tone": preferences.tone,
+        "content_length": preferences.content_length,
+        "include_emojis": preferences.include_emojis,
+        "hashtags": list(preferences.hashtags or []),
+    }
+
+def require_gemini():
+    model = initialize_gemini()
+    if not model:
+        raise HTTPException(status_code=500, detail="Gemini API key not configured. Please add GEMINI_API_KEY to your environment.")
+    return model
+
+async def generate_post(model, prompt: str, platform: str, topic: str, preferences: ContentPreference) -> GenerateContentResponse:
+    """Generate the post and its hashtags with one structured Gemini call"""
+    response = await generate(
+        model,
+        build_structured_prompt(prompt, platform, topic),
+        user_id=preferences.user_id,
+        generation_config={"response_mime_type": "application/json"}
+    )
+    parsed = parse_structured_response(response.text.strip())
+    if parsed is None:
+        # The model ignored the JSON instructions, keep its text as the post
+        parsed = {"content": response.text.strip(), "hashtags": []}
+    
+    hashtags = parsed["hashtags"] or fallback_hashtags(preferences)
+    return GenerateContentResponse(
+        content=parsed["content"],
+        hashtags=hashtags,
+        generated_at=datetime.utcnow()
+    )
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class GenerationContext:
+    """Everything resolved from a GenerateContentRequest before any Gemini call"""
+
+    def __init__(self, prompt: str, hashtag_prompt: str, platform: str, topic: str,
+                 preferences: ContentPreference, cache_key: str, use_cache: bool):
+        self.prompt = prompt
+        self.hashtag_prompt = hashtag_prompt
+        self.platform = platform
+        self.topic = topic
+        self.preferences = preferences
+        self.cache_key = cache_key
+        self.use_cache = use_cache
+
+def build_generation_context(preferences: ContentPreference, topic: Optional[str], platform: Optional[str],
+                             custom_prompt: Optional[str], bypass_cache: bool,
+                             variant: int = 1, variants: int = 1) -> GenerationContext:
+    topic = topic or (preferences.topics[0] if preferences.topics else "general topic")
+    platform = platform or "social media"
+    
+    prompt = build_content_prompt(preferences, topic, platform)
+    if custom_prompt:
+        prompt = custom_prompt
+    if variants > 1:
+        # Distinct prompts keep variants from collapsing onto one cache entry
+        prompt += f"\n\nThis is variant {variant} of {variants}, make it clearly different from the other variants."
+    hashtag_prompt = build_hashtag_prompt(platform, topic)
+    
+    cache_key = generation_cache_key(
+        GEMINI_MODEL_NAME, (prompt, hashtag_prompt), cache_relevant_preferences(preferences)
+    )
+    use_cache = settings.generation_cache_enabled and not bypass_cache
+    if not use_cache:
+        generation_cache.record_bypass()
+    return GenerationContext(prompt, hashtag_prompt, platform, topic, preferences, cache_key, use_cache)
+
+async def get_required_preferences(db: AsyncSession, user_id: int) -> ContentPreference:
+    preferences = await get_cached_preferences(db, user_id)
+    
+    if not preferences:
+        raise HTTPException(status_code=404, detail="Please set your content preferences first")
+    return preferences
+
+async def resolve_generation_context(request: GenerateContentRequest, current_user: User, db: AsyncSession) -> GenerationContext:
+    preferences = await get_required_preferences(db, current_user.id)
+    return build_generation_context(
+        preferences, request.topic, request.platform, request.custom_prompt, request.bypass_cache
+    )
+
+async def generate_with_cache(context: GenerationContext, model=None) -> GenerateContentResponse:
+    if context.use_cache:
+        cached = await generation_cache.get(context.cache_key)
+        if cached is not None:
+            return GenerateContentResponse(**cached)
+    
+    model = model or require_gemini()
+    
+    async def call() -> GenerateContentResponse:
+        try:
+            result = await generate_post(model, context.prompt, context.platform, context.topic, context.preferences)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating content: {str(e)}")
+        
+        if settings.generation_cache_enabled:
+            await generation_cache.set(context.cache_key, result.model_dump(mode="json"))
+        return result
+    
+    # The cache key covers the model, the prompts and the preferences that shape the
+    # result, so identical requests in flight at the same time share one Gemini call
+    return await generation_flights.run(context.cache_key, call)
+
+async def screen_generated(db: AsyncSession, user_id: int, result: GenerateContentResponse) -> GenerateContentResponse:
+    """Flag the result as a near duplicate of one of the user's posts, or raise 409 when NEAR_DUPLICATE_ACTION blocks"""
+    match = await screen_near_duplicate(db, user_id, simhash(result.content), subject="Generated content")
+    if match is None:
+        return result
+    return result.model_copy(update={
+        "near_duplicate_of": match.post_id,
+        "near_duplicate_similarity": round(match.similarity, 3),
+    })
+
+@router.post("/generate", response_model=GenerateContentResponse)
+async def generate_content(
+    request: GenerateContentRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    context = await resolve_generation_context(request, current_user, db)
+    result = await generate_with_cache(context)
+    return await screen_generated(db, current_user.id, result)
+
+@router.post("/generate/stream")
+async def generate_content_stream(
+    request: GenerateContentRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Server-Sent Events: "token" events carry text as Gemini produces it, "done" carries the full GenerateContentResponse"""
+    context = await resolve_generation_context(request, current_user, db)
+    
+    cached = await generation_cache.get(context.cache_key) if context.use_cache else None
+    if cached is None:
+        # An identical /generate call in flight is replayed like a cache hit once it is done
+        in_flight = generation_flights.join(context.cache_key)
+        if in_flight is not None:
+            try:
+                cached = (await in_flight).model_dump(mode="json")
+            except HTTPException:
+                pass
+    model = None
+    if cached is None:
+        model = require_gemini()
+        # A 503 while the response can still carry it, rather than an error event
+        gemini_limiter.check()
+    
+    user_id = current_user.id
+    
+    async def done(result: GenerateContentResponse) -> str:
+        # Screened like /generate; the request's session is closed once streaming starts
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await screen_generated(session, user_id, result)
+        except HTTPException as e:
+            return sse_event("error", {"detail": e.detail})
+        return sse_event("done", result.model_dump(mode="json"))
+    
+    async def events():
+        if cached is not None:
+            yield sse_event("token", {"text": cached["content"]})
+            yield await done(GenerateContentResponse(**cached))
+            return
         
-        hashtag_prompt = f"Generate 3-5 relevant hashtags for this {platform} post about {topic}. Return only the hashtags separated by spaces, starting with #."
-        hashtag_response = model.generate_content(hashtag_prompt)
-        hashtags_text = hashtag_response.text.strip()
-        hashtags = [tag.strip() for tag in hashtags_text.split() if tag.startswith('#')]
+        # Hashtags are generated concurrently while the post text streams
+        hashtag_task = asyncio.create_task(generate(model, context.hashtag_prompt, user_id=user_id))
+        try:
+            chunks = []
+            async for text in stream_text(model, context.prompt, user_id=user_id):
+                chunks.append(text)
+                yield sse_event("token", {"text": text})
+            
+            hashtag_response = await hashtag_task
+            hashtags = parse_hashtags(hashtag_response.text.strip()) or fallback_hashtags(context.preferences)
+            result = GenerateContentResponse(
+                content="".join(chunks).strip(),
+                hashtags=hashtags,
+                generated_at=datetime.utcnow()
+            )
+        except HTTPException as e:
+            hashtag_task.cancel()
+            yield sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            hashtag_task.cancel()
+            yield sse_event("error", {"detail": f"Error generating content: {str(e)}"})
+            return
+        
+        if settings.generation_cache_enabled:
+            await generation_cache.set(context.cache_key, result.model_dump(mode="json"))
+        yield await done(result)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate/batch")
+async def generate_content_batch(
+    request: GenerateBatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Run topic x platform x variant jobs concurrently, streaming one NDJSON line per finished item"""
+    total_items = sum(job.variants for job in request.jobs)
+    if total_items > settings.generation_batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {total_items} items, the maximum is {settings.generation_batch_max_items}"
+        )
+    
+    preferences = await get_required_preferences(db, current_user.id)
+    contexts = []
+    for job_index, job in enumerate(request.jobs):
+        for variant in range(1, job.variants + 1):
+            context = build_generation_context(
+                preferences, job.topic, job.platform, request.custom_prompt, request.bypass_cache,
+                variant=variant, variants=job.variants
+            )
+            contexts.append((job_index, variant, context))
+    
+    model = require_gemini()
+    user_id = current_user.id
+    semaphore = asyncio.Semaphore(settings.generation_batch_concurrency)
+    
+    async def run_item(job_index: int, variant: int, context: GenerationContext) -> GenerateBatchResult:
+        async with semaphore:
+            try:
+                result = await generate_with_cache(context, model)
+            except HTTPException as e:
+                return GenerateBatchResult(
+                    job_index=job_index, variant=variant, topic=context.topic,
+                    platform=context.platform, error=e.detail
+                )
+        return GenerateBatchResult(
+            job_index=job_index, variant=variant, topic=context.topic, platform=context.platform,
+            content=result.content, hashtags=result.hashtags, generated_at=result.generated_at
+        )
+    
+    async def lines():
+        completed = []
+        tasks = [asyncio.create_task(run_item(*item)) for item in contexts]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                completed.append(item)
+                yield item.model_dump_json() + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
         
-        if not hashtags and preferences.hashtags:
-            hashtags = [f"#{tag}" if not tag.startswith('#') else tag for tag in preferences.hashtags[:3]]
+        succeeded = [item for item in completed if item.error is None]
+        post_ids = []
+        if request.save_as_drafts and succeeded:
+            # The request's session is closed once streaming starts, drafts get their own transaction
+            async with AsyncSessionLocal() as session:
+                drafts = [
+                    Post(
+                        user_id=user_id,
+                        content=item.content,
+                        content_simhash=to_signed(simhash(item.content)),
+                        hashtags=item.hashtags,
+                        platforms=[item.platform] if item.platform != "social media" else [],
+                        status="draft"
+                    )
+                    for item in succeeded
+                ]
+                session.add_all(drafts)
+                await session.flush()
+                await record_post_changes(session, [(None, post_key(draft)) for draft in drafts])
+                await session.commit()
+                post_ids = [draft.id for draft in drafts]
+                for draft in drafts:
+                    near_duplicate_index.add(user_id, draft.id, to_unsigned(draft.content_simhash))
         
-        return GenerateContentResponse(
-            content=content,
-            hashtags=hashtags,
-            generated_at=datetime.utcnow()
+        summary = GenerateBatchSummary(
+            completed=len(succeeded),
+            failed=len(completed) - len(succeeded),
+            post_ids=post_ids
         )
+        yield summary.model_dump_json() + "\n"
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating content: {str(e)}")
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
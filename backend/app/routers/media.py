@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Set
+from ..database import get_db
+from ..models import User, MediaAsset
+from ..schemas import MediaAssetResponse
+from ..auth import get_current_active_user
+from ..media import RENDITIONS, media_processor, media_url, original_path, receive_upload
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+DIGEST = Path(..., pattern="^[0-9a-f]{64}$")
+# Names never change meaning, so shared caches and the platforms may keep them forever
+IMMUTABLE = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+def media_response(asset: MediaAsset) -> MediaAssetResponse:
+    return MediaAssetResponse(
+        id=asset.id,
+        sha256=asset.sha256,
+        content_type=asset.content_type,
+        size_bytes=asset.size_bytes,
+        width=asset.width,
+        height=asset.height,
+        filename=asset.filename,
+        created_at=asset.created_at,
+        url=media_url(asset.sha256),
+        renditions={name: media_url(asset.sha256, name) for name in RENDITIONS}
+    )
+
+async def get_owned_media_ids(db: AsyncSession, media_ids: Iterable[int], user_id: int) -> Set[int]:
+    media_ids = set(media_ids)
+    if not media_ids:
+        return set()
+    result = await db.execute(
+        select(MediaAsset.id).where(MediaAsset.id.in_(media_ids), MediaAsset.user_id == user_id)
+    )
+    return set(result.scalars().all())
+
+async def find_user_asset(db: AsyncSession, user_id: int, digest: str):
+    result = await db.execute(
+        select(MediaAsset).where(MediaAsset.user_id == user_id, MediaAsset.sha256 == digest)
+    )
+    return result.scalars().first()
+
+@router.post("/", response_model=MediaAssetResponse)
+async def upload_media(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload an image as the "file" field of a multipart/form-data body"""
+    user_id = current_user.id
+    upload = await receive_upload(request)
+
+    asset = await find_user_asset(db, user_id, upload.digest)
+    if asset is not None:
+        return media_response(asset)
+
+    asset = MediaAsset(
+        user_id=user_id,
+        sha256=upload.digest,
+        content_type=upload.content_type,
+        size_bytes=upload.size_bytes,
+        width=upload.width,
+        height=upload.height,
+        filename=upload.filename
+    )
+    db.add(asset)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # The same file was uploaded concurrently
+        await db.rollback()
+        asset = await find_user_asset(db, user_id, upload.digest)
+        if asset is None:
+            raise
+        return media_response(asset)
+    await db.refresh(asset)
+    return media_response(asset)
+
+@router.get("/{media_id}", response_model=MediaAssetResponse)
+async def get_media(
+    media_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(MediaAsset).where(MediaAsset.id == media_id, MediaAsset.user_id == current_user.id)
+    )
+    asset = result.scalars().first()
+
+    if not asset:
+        raise HTTPException(status_code=404, detail="Media not found")
+    return media_response(asset)
+
+@router.get("/files/{digest}")
+async def get_media_file(digest: str = DIGEST, db: AsyncSession = Depends(get_db)):
+    """The original upload. Public, the platforms fetch images without our credentials"""
+    result = await db.execute(select(MediaAsset.content_type).where(MediaAsset.sha256 == digest).limit(1))
+    content_type = result.scalar_one_or_none()
+    path = original_path(digest)
+
+    if content_type is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Media not found")
+    return FileResponse(path, media_type=content_type, headers=IMMUTABLE)
+
+@router.get("/files/{digest}/{rendition}.jpg")
+async def get_media_rendition(rendition: str, digest: str = DIGEST):
+    """A derived image, rendered on the first request and served from disk after that"""
+    if rendition not in RENDITIONS:
+        raise HTTPException(status_code=404, detail="Unknown rendition")
+    try:
+        path = await media_processor.rendition(digest, rendition)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media not found")
+    return FileResponse(path, media_type="image/jpeg", headers=IMMUTABLE)
@@ -1,75 +1,422 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, cast, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import base64
 from ..database import get_db
-from ..models import User, Post, SocialAccount
-from ..schemas import PostCreate, PostUpdate, PostResponse
+from ..models import User, Post, PublishAttempt
+from ..schemas import (
+    PostCreate, PostUpdate, PostResponse, PostBulkCreate, PostBulkUpdate, PostBulkDelete,
+    PostSearchResult, BulkItemResult, BulkOperationResponse, PublishAttemptResponse, PublishResponse, naive_utc
+)
+from ..analytics import post_key, post_keys, record_post_change, record_post_changes, record_posts_removed
 from ..auth import get_current_active_user
-from ..social_media_integrations import SocialMediaPublisher
+from ..conditional import entity_tag, not_modified, validator_headers
+from ..config import settings
+from ..near_duplicates import (
+    near_duplicate_headers, near_duplicate_index, screen_near_duplicate, simhash, to_signed
+)
+from ..search import ranked_posts, search_terms
+from ..serialization import list_response, response_columns
+from ..publishing import apply_publishing_results, publish_post_attempts
+from .media import get_owned_media_ids
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+async def get_user_post(db: AsyncSession, post_id: int, user_id: int):
+    result = await db.execute(
+        select(Post).where(
+            Post.id == post_id,
+            Post.user_id == user_id
+        )
+    )
+    return result.scalars().first()
+
+def encode_cursor(post: Post) -> str:
+    raw = f"{post.created_at.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, post_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(post_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def post_etag(post_id: int, updated_at: Optional[datetime]) -> str:
+    return entity_tag("post", post_id, updated_at, tuple(PostResponse.model_fields))
+
+def json_array_contains(db: AsyncSession, column, value: str):
+    """Membership test on a JSON array column for the session's dialect"""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(column, JSONB).contains([value])
+    values = func.json_each(column).table_valued("value")
+    return select(values.c.value).where(values.c.value == value).exists()
+
+def platform_filter(db: AsyncSession, platform: str):
+    return json_array_contains(db, Post.platforms, platform)
+
+def encode_search_cursor(below_id: Optional[int], row) -> str:
+    """The ranking window of the row (see search.ranked_posts) and its position in it"""
+    raw = f"{'' if below_id is None else below_id}|{row.rank!r}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_search_cursor(cursor: str) -> Tuple[Optional[int], float, int]:
+    try:
+        below_id, rank, post_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return (int(below_id) if below_id else None), float(rank), int(post_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/", response_model=List[PostResponse])
 async def get_posts(
+    request: Request,
+    limit: int = Query(settings.posts_page_size_default, ge=1, le=settings.posts_page_size_max),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    platform: Optional[str] = None,
+    scheduled_from: Optional[datetime] = None,
+    scheduled_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Newest first, paginated on (created_at, id). The next page's cursor is returned in X-Next-Cursor.
+
+    The ETag fingerprints every post matching the filters by count and latest
+    updated_at, so a poll that matches it costs one aggregate query. There is no
+    Last-Modified, deleting a post does not advance the latest updated_at.
+    """
+    filters = [Post.user_id == current_user.id]
+    if status is not None:
+        filters.append(Post.status == status)
+    if platform is not None:
+        filters.append(platform_filter(db, platform))
+    if scheduled_from is not None:
+        filters.append(Post.scheduled_time >= naive_utc(scheduled_from))
+    if scheduled_to is not None:
+        filters.append(Post.scheduled_time < naive_utc(scheduled_to))
+    
+    count, last_updated_at = (await db.execute(select(func.count(), func.max(Post.updated_at)).where(*filters))).one()
+    etag = entity_tag("posts", current_user.id, str(request.query_params), count, last_updated_at, tuple(PostResponse.model_fields))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    
+    query = select(*response_columns(Post, PostResponse)).where(*filters)
+    if cursor is not None:
+        query = query.where(tuple_(Post.created_at, Post.id) < tuple_(*decode_cursor(cursor)))
+    
+    query = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    
+    headers = validator_headers(etag)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return list_response(rows, PostResponse, headers)
+
+@router.get("/search", response_model=List[PostSearchResult])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    hashtag: Optional[List[str]] = Query(None),
+    status: Optional[str] = None,
+    limit: int = Query(settings.posts_page_size_default, ge=1, le=settings.posts_page_size_max),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Ranked full-text search over content and hashtags, every word of q matches as a prefix.
+
+    Each hashtag parameter must be one of the post's hashtags exactly. Best matches
+    come first within each window of the newest search_rank_window matches, then the
+    next older window follows; the next page's cursor is returned in X-Next-Cursor.
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no searchable words")
+    
+    filters = [json_array_contains(db, Post.hashtags, "#" + tag.lstrip("#")) for tag in hashtag or []]
+    if status is not None:
+        filters.append(Post.status == status)
+    dialect = db.get_bind().dialect.name
+    columns = response_columns(Post, PostResponse)
+    below_id, position = None, None
+    if cursor is not None:
+        below_id, *position = decode_search_cursor(cursor)
+    
+    # (window, row) pairs, one row past the page tells whether there is a next one
+    rows: List[tuple] = []
+    while len(rows) <= limit:
+        # Ranks are computed in a subquery, SQLite only allows bm25() in the search's own select list
+        ranked = ranked_posts(dialect, columns, terms, current_user.id, filters, below_id).subquery()
+        page = select(ranked)
+        if position is not None:
+            rank, post_id = position
+            page = page.where(or_(ranked.c.rank < rank, and_(ranked.c.rank == rank, ranked.c.id < post_id)))
+        page = page.order_by(ranked.c.rank.desc(), ranked.c.id.desc()).limit(limit + 1 - len(rows))
+        rows.extend((below_id, row) for row in (await db.execute(page)).all())
+        if len(rows) > limit:
+            break
+        
+        # This window is exhausted, older matches follow in the next one
+        window_size, lowest_id = (await db.execute(select(func.count(), func.min(ranked.c.id)))).one()
+        if window_size < settings.search_rank_window:
+            break
+        below_id, position = lowest_id, None
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_search_cursor(*rows[-1])
+    return list_response([row for _, row in rows], PostSearchResult, headers)
+
+def check_bulk_size(count: int):
+    if count > settings.posts_bulk_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bulk request has {count} items, the maximum is {settings.posts_bulk_max_items}"
+        )
+
+async def get_owned_post_ids(db: AsyncSession, post_ids: List[int], user_id: int) -> set:
+    result = await db.execute(
+        select(Post.id).where(Post.id.in_(set(post_ids)), Post.user_id == user_id)
+    )
+    return set(result.scalars().all())
+
+async def check_media_owned(db: AsyncSession, media_id: Optional[int], user_id: int):
+    if media_id is not None and not await get_owned_media_ids(db, [media_id], user_id):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+def bulk_response(results: List[BulkItemResult]) -> BulkOperationResponse:
+    succeeded = sum(1 for result in results if result.success)
+    return BulkOperationResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+@router.post("/bulk", response_model=BulkOperationResponse)
+async def bulk_create_posts(
+    bulk_data: PostBulkCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    posts = db.query(Post).filter(Post.user_id == current_user.id).order_by(Post.created_at.desc()).all()
-    return posts
+    check_bulk_size(len(bulk_data.items))
+    media_ids = {item.media_id for item in bulk_data.items if item.media_id is not None}
+    missing_media_ids = media_ids - await get_owned_media_ids(db, media_ids, current_user.id)
+    if missing_media_ids:
+        raise HTTPException(status_code=404, detail=f"Media not found: {sorted(missing_media_ids)}")
+    now = datetime.utcnow()
+    fingerprints = [simhash(item.content) for item in bulk_data.items]
+    rows = [
+        {
+            "user_id": current_user.id,
+            "content": item.content,
+            "content_simhash": to_signed(fingerprint),
+            "hashtags": item.hashtags,
+            "platforms": item.platforms,
+            "scheduled_time": item.scheduled_time,
+            "media_id": item.media_id,
+            "status": "scheduled" if item.scheduled_time else "draft",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for item, fingerprint in zip(bulk_data.items, fingerprints)
+    ]
+    # PostgreSQL needs the sentinel form to guarantee ids come back in parameter order,
+    # SQLite returns multi-row VALUES in insertion order and would otherwise fall back to row-at-a-time
+    sort_by_parameter_order = db.get_bind().dialect.name == "postgresql"
+    result = await db.execute(
+        insert(Post).returning(
+            Post.id, Post.user_id, Post.created_at, Post.status, Post.platforms,
+            sort_by_parameter_order=sort_by_parameter_order
+        ), rows
+    )
+    created = result.all()
+    post_ids = [row.id for row in created]
+    await record_post_changes(db, [(None, post_key(row)) for row in created])
+    await db.commit()
+    for post_id, fingerprint in zip(post_ids, fingerprints):
+        near_duplicate_index.add(current_user.id, post_id, fingerprint)
+    
+    return bulk_response([
+        BulkItemResult(index=index, id=post_id, success=True)
+        for index, post_id in enumerate(post_ids)
+    ])
+
+@router.patch("/bulk", response_model=BulkOperationResponse)
+async def bulk_update_posts(
+    bulk_data: PostBulkUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    check_bulk_size(len(bulk_data.items))
+    owned_ids = await get_owned_post_ids(db, [item.id for item in bulk_data.items], current_user.id)
+    owned_media_ids = await get_owned_media_ids(
+        db, [item.media_id for item in bulk_data.items if item.media_id is not None], current_user.id
+    )
+    now = datetime.utcnow()
+    
+    results: List[BulkItemResult] = []
+    # Items setting identical values collapse into one UPDATE ... WHERE id IN (...),
+    # the rest are sent as executemany batches grouped by the columns they touch.
+    by_values: Dict[tuple, List[int]] = {}
+    for index, item in enumerate(bulk_data.items):
+        if item.id not in owned_ids:
+            results.append(BulkItemResult(index=index, id=item.id, success=False, error="Post not found"))
+            continue
+        if item.media_id is not None and item.media_id not in owned_media_ids:
+            results.append(BulkItemResult(index=index, id=item.id, success=False, error="Media not found"))
+            continue
+        
+        values = item.model_dump(exclude_unset=True, exclude={"id"})
+        values = {key: value for key, value in values.items() if value is not None}
+        if "scheduled_time" in values and "status" not in values:
+            values["status"] = "scheduled"
+        if "content" in values:
+            values["content_simhash"] = to_signed(simhash(values["content"]))
+        # Lists (hashtags, platforms) are grouped as tuples
+        values_key = tuple(sorted((key, tuple(value) if isinstance(value, list) else value) for key, value in values.items()))
+        by_values.setdefault(values_key, []).append(item.id)
+        results.append(BulkItemResult(index=index, id=item.id, success=True))
+    
+    # Only items changing a post's status or platforms move it between rollup rows
+    restatused_ids = {
+        item.id for item in bulk_data.items
+        if item.id in owned_ids
+        and any(value is not None for value in (item.status, item.scheduled_time, item.platforms))
+    }
+    before = await post_keys(db, restatused_ids) if restatused_ids else {}
+    
+    by_columns: Dict[tuple, List[dict]] = {}
+    for values_key, post_ids in by_values.items():
+        values = {key: list(value) if isinstance(value, tuple) else value for key, value in values_key}
+        values["updated_at"] = now
+        if len(post_ids) > 1:
+            await db.execute(
+                update(Post)
+                .where(Post.id.in_(post_ids), Post.user_id == current_user.id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            by_columns.setdefault(tuple(sorted(values)), []).append({"id": post_ids[0], **values})
+    
+    for rows in by_columns.values():
+        await db.execute(update(Post), rows)
+    if restatused_ids:
+        after = await post_keys(db, restatused_ids)
+        await record_post_changes(db, [(before[post_id], after[post_id]) for post_id in restatused_ids])
+    await db.commit()
+    if any(item.content is not None for item in bulk_data.items):
+        # Rebuilt from the stored fingerprints on the next check
+        near_duplicate_index.invalidate(current_user.id)
+    
+    return bulk_response(results)
+
+@router.post("/bulk/delete", response_model=BulkOperationResponse)
+async def bulk_delete_posts(
+    bulk_data: PostBulkDelete,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    check_bulk_size(len(bulk_data.ids))
+    owned_ids = await get_owned_post_ids(db, bulk_data.ids, current_user.id)
+    
+    if owned_ids:
+        await record_posts_removed(db, owned_ids)
+        await db.execute(
+            delete(PublishAttempt)
+            .where(PublishAttempt.post_id.in_(owned_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(Post)
+            .where(Post.id.in_(owned_ids), Post.user_id == current_user.id)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        near_duplicate_index.remove(current_user.id, owned_ids)
+    
+    return bulk_response([
+        BulkItemResult(index=index, id=post_id, success=post_id in owned_ids,
+                       error=None if post_id in owned_ids else "Post not found")
+        for index, post_id in enumerate(bulk_data.ids)
+    ])
 
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(
-        Post.id == post_id,
-        Post.user_id == current_user.id
-    ).first()
+    result = await db.execute(select(Post.updated_at).where(Post.id == post_id, Post.user_id == current_user.id))
+    updated_at = result.scalar_one_or_none()
+    if updated_at is not None:
+        cached = not_modified(request, post_etag(post_id, updated_at), updated_at)
+        if cached is not None:
+            return cached
+    
+    post = await get_user_post(db, post_id, current_user.id)
     
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    response.headers.update(validator_headers(post_etag(post.id, post.updated_at), post.updated_at))
     return post
 
 @router.post("/", response_model=PostResponse)
 async def create_post(
     post_data: PostCreate,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    await check_media_owned(db, post_data.media_id, current_user.id)
+    fingerprint = simhash(post_data.content)
+    match = await screen_near_duplicate(db, current_user.id, fingerprint)
+    
     new_post = Post(
         user_id=current_user.id,
         content=post_data.content,
+        content_simhash=to_signed(fingerprint),
         hashtags=post_data.hashtags,
         platforms=post_data.platforms,
         scheduled_time=post_data.scheduled_time,
+        media_id=post_data.media_id,
         status="scheduled" if post_data.scheduled_time else "draft"
     )
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    await db.flush()
+    await record_post_change(db, None, post_key(new_post))
+    await db.commit()
+    await db.refresh(new_post)
+    near_duplicate_index.add(current_user.id, new_post.id, fingerprint)
+    response.headers.update(near_duplicate_headers(match))
     return new_post
 
 @router.patch("/{post_id}", response_model=PostResponse)
 async def update_post(
     post_id: int,
     post_data: PostUpdate,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(
-        Post.id == post_id,
-        Post.user_id == current_user.id
-    ).first()
+    post = await get_user_post(db, post_id, current_user.id)
     
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    await check_media_owned(db, post_data.media_id, current_user.id)
     
+    before = post_key(post)
+    fingerprint = None
     if post_data.content is not None:
+        fingerprint = simhash(post_data.content)
+        match = await screen_near_duplicate(db, current_user.id, fingerprint, exclude_post_id=post.id)
+        response.headers.update(near_duplicate_headers(match))
         post.content = post_data.content
+        post.content_simhash = to_signed(fingerprint)
     if post_data.hashtags is not None:
         post.hashtags = post_data.hashtags
     if post_data.platforms is not None:
@@ -79,86 +426,113 @@ async def update_post(
         post.status = "scheduled"
     if post_data.status is not None:
         post.status = post_data.status
+    if post_data.media_id is not None:
+        post.media_id = post_data.media_id
     
     post.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(post)
+    await record_post_change(db, before, post_key(post))
+    await db.commit()
+    await db.refresh(post)
+    if fingerprint is not None:
+        near_duplicate_index.add(current_user.id, post.id, fingerprint, post.is_published)
     return post
 
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(
-        Post.id == post_id,
-        Post.user_id == current_user.id
-    ).first()
+    post = await get_user_post(db, post_id, current_user.id)
     
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    db.delete(post)
-    db.commit()
+    await record_posts_removed(db, [post.id])
+    await db.delete(post)
+    await db.commit()
+    near_duplicate_index.remove(current_user.id, [post_id])
     return {"message": "Post deleted successfully"}
 
-@router.post("/{post_id}/publish")
+@router.post("/{post_id}/publish", response_model=PublishResponse)
 async def publish_post(
     post_id: int,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(
-        Post.id == post_id,
-        Post.user_id == current_user.id
-    ).first()
+    post = await get_user_post(db, post_id, current_user.id)
     
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    # Fetch user's social account tokens
-    social_accounts = db.query(SocialAccount).filter(
-        SocialAccount.user_id == current_user.id,
-        SocialAccount.is_connected == True
-    ).all()
-    
-    # Build tokens dictionary from social accounts
-    user_tokens: Dict[str, str] = {}
-    for account in social_accounts:
-        platform_lower = account.platform.lower()
-        if account.access_token:
-            if platform_lower in ['threads']:
-                user_tokens['threads'] = account.access_token
-            elif platform_lower in ['instagram']:
-                user_tokens['instagram'] = account.access_token
-    
-    # Initialize the social media publisher
-    publisher = SocialMediaPublisher()
-    
-    # Publish to the selected platforms
-    publishing_results = publisher.publish_to_platforms(
-        content=post.content,
-        platforms=post.platforms or [],
-        user_tokens=user_tokens if user_tokens else None,
-        image_url=None  # TODO: Add image support if needed
+    if post.status == "publishing" and post.lease_expires_at and post.lease_expires_at > datetime.utcnow():
+        raise HTTPException(status_code=409, detail="Post is already being published")
+    
+    # Platforms reject content they have already seen from the account
+    match = await screen_near_duplicate(
+        db, current_user.id, simhash(post.content), exclude_post_id=post.id, published_only=True
     )
+    response.headers.update(near_duplicate_headers(match))
     
-    # Check if at least one platform succeeded
-    any_success = any(result.get("success", False) for result in publishing_results)
+    # Platforms that already succeeded are not posted to again
+    attempts, publishing_results = await publish_post_attempts(db, post)
     
-    if any_success:
-        post.is_published = True
-        post.status = "published"
-        db.commit()
-        db.refresh(post)
-    else:
-        post.status = "failed"
-        db.commit()
-        db.refresh(post)
+    any_success = await apply_publishing_results(db, post, attempts)
+    await db.commit()
+    await db.refresh(post)
     
     return {
         "message": "Publishing complete" if any_success else "Publishing failed",
-        "post": post,
+        "post": PostResponse.model_validate(post),
         "publishing_results": publishing_results
     }
+
+@router.post("/{post_id}/publish/retry", response_model=PublishResponse)
+async def retry_publish_post(
+    post_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    post = await get_user_post(db, post_id, current_user.id)
+    
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    
+    if post.status == "publishing" and post.lease_expires_at and post.lease_expires_at > datetime.utcnow():
+        raise HTTPException(status_code=409, detail="Post is already being published")
+    
+    failed = await db.execute(
+        select(PublishAttempt.id).where(PublishAttempt.post_id == post.id, PublishAttempt.state == "failed").limit(1)
+    )
+    if failed.first() is None:
+        raise HTTPException(status_code=409, detail="No failed platforms to retry")
+    
+    # Only the failed legs are published again
+    attempts, publishing_results = await publish_post_attempts(db, post, states=("failed",))
+    
+    any_success = await apply_publishing_results(db, post, attempts)
+    await db.commit()
+    await db.refresh(post)
+    
+    return {
+        "message": "Publishing complete" if any_success else "Publishing failed",
+        "post": PostResponse.model_validate(post),
+        "publishing_results": publishing_results
+    }
+
+@router.get("/{post_id}/publish-attempts", response_model=List[PublishAttemptResponse])
+async def get_publish_attempts(
+    post_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    post = await get_user_post(db, post_id, current_user.id)
+    
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    
+    result = await db.execute(
+        select(PublishAttempt).where(PublishAttempt.post_id == post.id).order_by(PublishAttempt.id)
+    )
+    return result.scalars().all()
@@ -1,35 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from ..database import get_db
 from ..models import User, ContentPreference
 from ..schemas import ContentPreferenceCreate, ContentPreferenceResponse
 from ..auth import get_current_active_user
+from ..cache import Cache
+from ..conditional import entity_tag, not_modified, validator_headers
+from ..config import settings
+from ..metrics import register_provider
 
 router = APIRouter(prefix="/preferences", tags=["content preferences"])
 
+async def get_user_preferences(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(ContentPreference).where(ContentPreference.user_id == user_id)
+    )
+    return result.scalars().first()
+
+PREFERENCE_FIELDS = ("id", "user_id", *ContentPreferenceCreate.model_fields)
+preferences_cache = Cache("preferences", settings.preferences_cache_ttl_seconds, settings.preferences_cache_size)
+register_provider("preferences_cache", preferences_cache.stats)
+
+async def get_cached_preferences(db: AsyncSession, user_id: int) -> Optional[ContentPreference]:
+    """Preferences for read-only use, hits are transient ContentPreference instances"""
+    if settings.preferences_cache_enabled:
+        cached = await preferences_cache.get(str(user_id))
+        if cached is not None:
+            return ContentPreference(**cached)
+    
+    preferences = await get_user_preferences(db, user_id)
+    if preferences is not None and settings.preferences_cache_enabled:
+        await preferences_cache.set(str(user_id), {field: getattr(preferences, field) for field in PREFERENCE_FIELDS})
+    return preferences
+
+def preferences_etag(preferences_id: int, updated_at) -> str:
+    return entity_tag("preferences", preferences_id, updated_at, tuple(ContentPreferenceResponse.model_fields))
+
 @router.get("/", response_model=ContentPreferenceResponse)
 async def get_content_preferences(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    preferences = db.query(ContentPreference).filter(
-        ContentPreference.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(ContentPreference.id, ContentPreference.updated_at).where(ContentPreference.user_id == current_user.id)
+    )
+    row = result.first()
+    if row is not None and row.updated_at is not None:
+        cached = not_modified(request, preferences_etag(row.id, row.updated_at), row.updated_at)
+        if cached is not None:
+            return cached
+    
+    preferences = await get_user_preferences(db, current_user.id)
     
     if not preferences:
         raise HTTPException(status_code=404, detail="Content preferences not found")
     
+    response.headers.update(validator_headers(preferences_etag(preferences.id, preferences.updated_at), preferences.updated_at))
     return preferences
 
 @router.put("/", response_model=ContentPreferenceResponse)
 async def update_content_preferences(
     preferences_data: ContentPreferenceCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    preferences = db.query(ContentPreference).filter(
-        ContentPreference.user_id == current_user.id
-    ).first()
+    preferences = await get_user_preferences(db, current_user.id)
     
     if not preferences:
         preferences = ContentPreference(user_id=current_user.id)
@@ -42,6 +81,7 @@ async def update_content_preferences(
     preferences.content_length = preferences_data.content_length
     preferences.include_emojis = preferences_data.include_emojis
     
-    db.commit()
-    db.refresh(preferences)
+    await db.commit()
+    await db.refresh(preferences)
+    await preferences_cache.delete(str(current_user.id))
     return preferences
@@ -1,26 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from ..database import get_db
 from ..models import User, SocialAccount
 from ..schemas import SocialAccountCreate, SocialAccountResponse
 from ..auth import get_current_active_user
+from ..serialization import list_response, response_columns
 
 router = APIRouter(prefix="/social-accounts", tags=["social accounts"])
 
+async def get_user_social_account(db: AsyncSession, account_id: int, user_id: int):
+    result = await db.execute(
+        select(SocialAccount).where(
+            SocialAccount.id == account_id,
+            SocialAccount.user_id == user_id
+        )
+    )
+    return result.scalars().first()
+
 @router.get("/", response_model=List[SocialAccountResponse])
 async def get_social_accounts(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    accounts = db.query(SocialAccount).filter(SocialAccount.user_id == current_user.id).all()
-    return accounts
+    result = await db.execute(
+        select(*response_columns(SocialAccount, SocialAccountResponse)).where(SocialAccount.user_id == current_user.id)
+    )
+    return list_response(result.all(), SocialAccountResponse)
 
 @router.post("/", response_model=SocialAccountResponse)
 async def create_social_account(
     account: SocialAccountCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     new_account = SocialAccount(
         user_id=current_user.id,
@@ -28,43 +41,37 @@ async def create_social_account(
         account_name=account.account_name
     )
     db.add(new_account)
-    db.commit()
-    db.refresh(new_account)
+    await db.commit()
+    await db.refresh(new_account)
     return new_account
 
 @router.delete("/{account_id}")
 async def delete_social_account(
     account_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    account = db.query(SocialAccount).filter(
-        SocialAccount.id == account_id,
-        SocialAccount.user_id == current_user.id
-    ).first()
+    account = await get_user_social_account(db, account_id, current_user.id)
     
     if not account:
         raise HTTPException(status_code=404, detail="Social account not found")
     
-    db.delete(account)
-    db.commit()
+    await db.delete(account)
+    await db.commit()
     return {"message": "Social account deleted successfully"}
 
 @router.patch("/{account_id}/toggle")
 async def toggle_social_account(
     account_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    account = db.query(SocialAccount).filter(
-        SocialAccount.id == account_id,
-        SocialAccount.user_id == current_user.id
-    ).first()
+    account = await get_user_social_account(db, account_id, current_user.id)
     
     if not account:
         raise HTTPException(status_code=404, detail="Social account not found")
     
     account.is_connected = not account.is_connected
-    db.commit()
-    db.refresh(account)
+    await db.commit()
+    await db.refresh(account)
     return account
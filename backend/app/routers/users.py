@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, Depends, Request, Response
 from ..models import User
 from ..schemas import UserResponse
 from ..auth import get_current_active_user
+from ..conditional import entity_tag, not_modified, validator_headers
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Users have no updated_at, the ETag covers the returned fields themselves"""
+    etag = entity_tag("user", *(getattr(current_user, name) for name in UserResponse.model_fields))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    response.headers.update(validator_headers(etag))
     return current_user
@@ -1,6 +1,14 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, Dict, Optional, List, Literal
+from datetime import date, datetime, timezone
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC, asyncpg refuses to bind an aware datetime against them"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -66,17 +74,65 @@ class GenerateContentRequest(BaseModel):
     topic: Optional[str] = None
     platform: Optional[str] = None
     custom_prompt: Optional[str] = None
+    bypass_cache: bool = False
 
 class GenerateContentResponse(BaseModel):
     content: str
     hashtags: List[str]
     generated_at: datetime
+    # Set when the content is a near duplicate of one of the user's posts
+    near_duplicate_of: Optional[int] = None
+    near_duplicate_similarity: Optional[float] = None
+
+class GenerateBatchJob(BaseModel):
+    topic: Optional[str] = None
+    platform: Optional[str] = None
+    variants: int = Field(default=1, ge=1, le=10)
+
+class GenerateBatchRequest(BaseModel):
+    jobs: List[GenerateBatchJob] = Field(min_length=1)
+    custom_prompt: Optional[str] = None
+    bypass_cache: bool = False
+    save_as_drafts: bool = False
+
+class GenerateBatchResult(BaseModel):
+    type: Literal["result"] = "result"
+    job_index: int
+    variant: int
+    topic: str
+    platform: str
+    content: Optional[str] = None
+    hashtags: List[str] = []
+    generated_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+class GenerateBatchSummary(BaseModel):
+    type: Literal["summary"] = "summary"
+    completed: int
+    failed: int
+    post_ids: List[int] = []
+
+class MediaAssetResponse(BaseModel):
+    id: int
+    sha256: str
+    content_type: str
+    size_bytes: int
+    width: int
+    height: int
+    filename: Optional[str]
+    created_at: datetime
+    url: str
+    # Derived images by name, rendered on first request
+    renditions: Dict[str, str]
 
 class PostCreate(BaseModel):
     content: str
     hashtags: List[str] = []
     platforms: List[str] = []
     scheduled_time: Optional[datetime] = None
+    media_id: Optional[int] = None
+    
+    _scheduled_time_utc = field_validator("scheduled_time")(naive_utc)
 
 class PostUpdate(BaseModel):
     content: Optional[str] = None
@@ -84,6 +140,46 @@ class PostUpdate(BaseModel):
     platforms: Optional[List[str]] = None
     scheduled_time: Optional[datetime] = None
     status: Optional[str] = None
+    media_id: Optional[int] = None
+    
+    _scheduled_time_utc = field_validator("scheduled_time")(naive_utc)
+
+class PostBulkCreate(BaseModel):
+    items: List[PostCreate] = Field(min_length=1)
+
+class PostBulkUpdateItem(PostUpdate):
+    id: int
+
+class PostBulkUpdate(BaseModel):
+    items: List[PostBulkUpdateItem] = Field(min_length=1)
+
+class PostBulkDelete(BaseModel):
+    ids: List[int] = Field(min_length=1)
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    success: bool
+    error: Optional[str] = None
+
+class BulkOperationResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+class PublishAttemptResponse(BaseModel):
+    platform: str
+    idempotency_key: str
+    state: str
+    remote_post_id: Optional[str]
+    attempts: int
+    last_error: Optional[str]
+    next_attempt_at: Optional[datetime]
+    published_at: Optional[datetime]
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
 
 class PostResponse(BaseModel):
     id: int
@@ -93,7 +189,35 @@ class PostResponse(BaseModel):
     scheduled_time: Optional[datetime]
     status: str
     is_published: bool
+    media_id: Optional[int] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
+
+class PostSearchResult(PostResponse):
+    rank: float
+
+class PublishResponse(BaseModel):
+    message: str
+    post: PostResponse
+    publishing_results: List[Dict[str, Any]]
+
+class AnalyticsPeriod(BaseModel):
+    start: date
+    posts: int
+    by_status: Dict[str, int]
+
+class PlatformPublishStats(BaseModel):
+    platform: str
+    succeeded: int
+    failed: int
+    success_rate: Optional[float]
+
+class AnalyticsSummary(BaseModel):
+    total_posts: int
+    by_status: Dict[str, int]
+    by_platform: Dict[str, int]
+    interval: Literal["day", "week"]
+    timeline: List[AnalyticsPeriod]
+    publishing: List[PlatformPublishStats]
@@ -0,0 +1,107 @@
+"""Full-text search over posts.
+
+PostgreSQL keeps a generated `search_vector` tsvector column on posts with a
+GIN index; SQLite keeps an external-content FTS5 table `posts_fts` in sync
+with triggers. Both are created by `python -m app.migrate` rather than the
+models, since neither type exists on the other dialect.
+"""
+import re
+from typing import List, Optional
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection
+from .config import settings
+from .models import Post
+
+_SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+# 'simple' does no stemming, content is written in many languages and prefix matching covers word forms
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(content, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(hashtags::text, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_posts_hashtags ON posts USING GIN ((hashtags::jsonb))",
+]
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE posts_fts USING fts5(
+        content, hashtags, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, content, hashtags) VALUES (new.id, new.content, new.hashtags);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, content, hashtags) VALUES ('delete', old.id, old.content, old.hashtags);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_fts_update AFTER UPDATE OF content, hashtags ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, content, hashtags) VALUES ('delete', old.id, old.content, old.hashtags);
+        INSERT INTO posts_fts(rowid, content, hashtags) VALUES (new.id, new.content, new.hashtags);
+    END
+    """,
+    # Index the posts that existed before the table
+    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+]
+
+
+def setup_search(connection: Connection):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+        ).first()
+        if not exists:
+            for statement in SQLITE_SEARCH_DDL:
+                connection.execute(text(statement))
+
+
+def search_terms(query: str) -> List[str]:
+    return [term.lower() for term in _SEARCH_TERM.findall(query)]
+
+
+def ranked_posts(dialect: str, columns: list, terms: List[str], user_id: int, filters: list,
+                 below_id: Optional[int] = None):
+    """Select of the columns plus `rank` for one window of the user's posts matching every term as a prefix.
+
+    Higher rank is better. Ranking every match of a common word costs time linear
+    in the matches, so matches are ranked in windows: the newest search_rank_window
+    matches with an id below below_id (all matches without it). Paging moves on to
+    the next window once one is exhausted, see routers/posts.search_posts, so every
+    match is reachable; with at most one window of matches the ranking is exact.
+    """
+    if below_id is not None:
+        filters = [*filters, Post.id < below_id]
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        search_vector = literal_column("posts.search_vector")
+        return (
+            select(*columns, func.ts_rank_cd(search_vector, tsquery).label("rank"))
+            .where(Post.user_id == user_id, search_vector.op("@@")(tsquery), *filters)
+            .order_by(Post.id.desc())
+            .limit(settings.search_rank_window)
+        )
+
+    posts_fts = table("posts_fts", column("rowid"))
+    match = " ".join(f'"{term}"*' for term in terms)
+    # bm25 is lower for better matches
+    return (
+        select(*columns, (-func.bm25(literal_column("posts_fts"))).label("rank"))
+        .select_from(posts_fts)
+        .join(Post, Post.id == posts_fts.c.rowid)
+        .where(Post.user_id == user_id, literal_column("posts_fts").op("MATCH")(match), *filters)
+        .order_by(posts_fts.c.rowid.desc())
+        .limit(settings.search_rank_window)
+    )
@@ -0,0 +1,41 @@
+from typing import Dict, List, Optional, Sequence, Type
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from .config import settings
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:  # orjson is optional, the stdlib encoder is used without it
+    orjson = None
+    ORJSONResponse = None
+
+
+def default_response_class() -> Type[JSONResponse]:
+    if orjson is not None and settings.fast_serialization:
+        return ORJSONResponse
+    return JSONResponse
+
+
+def response_columns(model, schema: Type[BaseModel]) -> List:
+    """The model's columns backing the schema's fields, for selecting rows instead of ORM objects"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def list_response(rows: Sequence, schema: Type[BaseModel], headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Serialize rows selected with `response_columns`.
+
+    The rows come from our own tables, so on the fast path they skip Pydantic
+    validation and go straight to the encoder. With FAST_SERIALIZATION off they
+    are validated against the schema as the response_model would.
+    """
+    if not settings.fast_serialization:
+        content = [schema.model_validate(dict(row._mapping)).model_dump(mode="json") for row in rows]
+        return JSONResponse(content, headers=headers)
+
+    content = [dict(row._mapping) for row in rows]
+    if orjson is None:
+        # The stdlib encoder does not handle datetimes
+        return JSONResponse(jsonable_encoder(content), headers=headers)
+    return ORJSONResponse(content, headers=headers)
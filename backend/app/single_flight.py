@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight call.
+
+    The first caller for a key starts the call, callers arriving while it runs
+    await the same task and get its result or its exception. The call runs as
+    its own task, so a caller that disconnects neither cancels it for the others
+    nor loses its side effects (the generation cache is filled either way).
+
+    Flights are per process; across workers the shared cache takes over once the
+    first call has finished.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.calls_saved = 0
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._flights.get(key)
+        if task is not None:
+            self.calls_saved += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def join(self, key: str) -> Optional[Awaitable]:
+        """The result of the call in flight for key, None if there is none"""
+        task = self._flights.get(key)
+        if task is None:
+            return None
+        self.calls_saved += 1
+        return asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Retrieved here so a failure whose callers all went away is not logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        requests = self.calls + self.calls_saved
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "calls_saved": self.calls_saved,
+            "saved_ratio": self.calls_saved / requests if requests else 0.0,
+        }
@@ -1,7 +1,36 @@
-import tweepy
-import requests
-from typing import Dict, List, Optional
+import asyncio
+import importlib.util
+import threading
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
 from .config import settings
+from .instrumentation import track_outbound
+from .rate_limits import account_key, rate_limiter
+
+X_DEFAULT_API_BASE_URL = "https://api.twitter.com"
+
+PLATFORM_KEYS = {"x": "x", "twitter": "x", "x/twitter": "x", "threads": "threads", "instagram": "instagram"}
+
+
+def platform_key(platform: str) -> str:
+    """Canonical platform name, the post's platforms list accepts several spellings of X"""
+    return PLATFORM_KEYS.get(platform.lower(), platform.lower())
+
+
+def create_x_adapter(base_url: str, **adapter_options):
+    """Transport adapter for tweepy's session, sends its requests to another host if X_API_BASE_URL is set"""
+    from requests.adapters import HTTPAdapter
+
+    class XBaseUrlAdapter(HTTPAdapter):
+        # tweepy hard-codes api.twitter.com
+        def send(self, request, **kwargs):
+            request.url = base_url.rstrip("/") + request.url[len(X_DEFAULT_API_BASE_URL):]
+            return super().send(request, **kwargs)
+
+    if base_url.rstrip("/") == X_DEFAULT_API_BASE_URL:
+        return HTTPAdapter(**adapter_options)
+    return XBaseUrlAdapter(**adapter_options)
 
 
 class XTwitterIntegration:
@@ -9,24 +38,46 @@ class XTwitterIntegration:
     
     def __init__(self):
         # Validate credentials before initializing client
-        if not all([settings.x_api_key, settings.x_api_secret, 
-                   settings.x_access_token, settings.x_access_token_secret]):
-            self.client = None
+        self.credentials_missing = not all([settings.x_api_key, settings.x_api_secret,
+                                            settings.x_access_token, settings.x_access_token_secret])
+        self._client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """tweepy client, created on the first tweet so that startup does not import tweepy"""
+        if self._client is None and not self.credentials_missing:
+            with self._client_lock:
+                if self._client is None and not self.credentials_missing:
+                    self._client = self._create_client()
+        return self._client
+    
+    def _create_client(self):
+        import requests
+        import tweepy
+
+        try:
+            client = tweepy.Client(
+                bearer_token=settings.x_bearer_token if settings.x_bearer_token else None,
+                consumer_key=settings.x_api_key,
+                consumer_secret=settings.x_api_secret,
+                access_token=settings.x_access_token,
+                access_token_secret=settings.x_access_token_secret,
+                # Raw responses keep the rate limit headers
+                return_type=requests.Response
+            )
+        except Exception as e:
             self.credentials_missing = True
-        else:
-            try:
-                self.client = tweepy.Client(
-                    bearer_token=settings.x_bearer_token if settings.x_bearer_token else None,
-                    consumer_key=settings.x_api_key,
-                    consumer_secret=settings.x_api_secret,
-                    access_token=settings.x_access_token,
-                    access_token_secret=settings.x_access_token_secret
-                )
-                self.credentials_missing = False
-            except Exception as e:
-                self.client = None
-                self.credentials_missing = True
-                self.init_error = str(e)
+            self.init_error = str(e)
+            return None
+        # tweepy keeps one requests.Session, size its pool for the publish threads
+        adapter = create_x_adapter(settings.x_api_base_url, pool_connections=1, pool_maxsize=settings.publish_max_workers)
+        client.session.mount(X_DEFAULT_API_BASE_URL, adapter)
+        return client
+    
+    def close(self):
+        if self._client is not None:
+            self._client.session.close()
     
     def post_tweet(self, content: str) -> Dict:
         """Post a tweet to X/Twitter"""
@@ -38,14 +89,27 @@ class XTwitterIntegration:
                 "message": "X/Twitter credentials are not properly configured. Please add them to Replit Secrets."
             }
         
+        import tweepy
+        
         try:
             response = self.client.create_tweet(text=content)
+            rate_limiter.observe("x", account_key(None), response.status_code, response.headers)
+            data = response.json().get("data") or {}
             return {
                 "success": True,
                 "platform": "X/Twitter",
-                "post_id": response.data['id'] if response.data else None,
+                "post_id": data.get('id'),
                 "message": "Successfully posted to X/Twitter"
             }
+        except tweepy.TooManyRequests as e:
+            rate_limiter.observe("x", account_key(None), 429, e.response.headers)
+            return {
+                "success": False,
+                "platform": "X/Twitter",
+                "rate_limited": True,
+                "error": str(e),
+                "message": f"X/Twitter rate limit reached: {str(e)}"
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -55,15 +119,63 @@ class XTwitterIntegration:
             }
 
 
+# Graph API error codes for application, user and page level throttling
+META_RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613}
+
+
+def is_meta_rate_limited(response: httpx.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code < 400:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    error = body.get("error") if isinstance(body, dict) else None
+    return isinstance(error, dict) and error.get("code") in META_RATE_LIMIT_ERROR_CODES
+
+
+def meta_rate_limited_result(platform_name: str, response: httpx.Response) -> Dict:
+    return {
+        "success": False,
+        "platform": platform_name,
+        "rate_limited": True,
+        "error": response.text,
+        "message": f"{platform_name} rate limit reached: {response.text}"
+    }
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(timeout: float) -> httpx.AsyncClient:
+    """Keep-alive connection pool shared by every call to one platform"""
+    return httpx.AsyncClient(
+        http2=settings.outbound_http2 and http2_available(),
+        timeout=httpx.Timeout(timeout, connect=settings.outbound_connect_timeout_seconds),
+        limits=httpx.Limits(
+            max_connections=settings.outbound_max_connections,
+            max_keepalive_connections=settings.outbound_max_keepalive_connections,
+            keepalive_expiry=settings.outbound_keepalive_expiry_seconds,
+        ),
+    )
+
+
 class ThreadsIntegration:
     """Integration for posting to Threads (Meta)"""
     
     def __init__(self):
         self.app_id = settings.threads_app_id
         self.app_secret = settings.threads_app_secret
-        self.base_url = "https://graph.threads.net/v1.0"
+        self.base_url = settings.threads_api_base_url
+        self.client = create_http_client(settings.threads_publish_timeout_seconds)
     
-    def post_thread(self, content: str, user_access_token: Optional[str] = None) -> Dict:
+    async def close(self):
+        await self.client.aclose()
+    
+    async def post_thread(self, content: str, user_access_token: Optional[str] = None) -> Dict:
         """Post to Threads"""
         try:
             if not user_access_token:
@@ -80,8 +192,11 @@ class ThreadsIntegration:
                 "access_token": user_access_token
             }
             
-            response = requests.post(url, json=payload)
+            response = await self.client.post(url, json=payload)
+            rate_limiter.observe("threads", account_key(user_access_token), response.status_code, response.headers)
             
+            if is_meta_rate_limited(response):
+                return meta_rate_limited_result("Threads", response)
             if response.status_code == 200:
                 return {
                     "success": True,
@@ -111,10 +226,52 @@ class InstagramIntegration:
     def __init__(self):
         self.app_id = settings.instagram_app_id
         self.app_secret = settings.instagram_app_secret
-        self.base_url = "https://graph.instagram.com/v18.0"
+        self.base_url = settings.instagram_api_base_url
+        self.client = create_http_client(settings.instagram_publish_timeout_seconds)
+    
+    async def close(self):
+        await self.client.aclose()
     
-    def post_to_instagram(self, content: str, image_url: Optional[str] = None, user_access_token: Optional[str] = None) -> Dict:
-        """Post to Instagram using proper Media API flow"""
+    async def wait_for_container(self, container_id: str, user_access_token: str) -> Optional[Dict]:
+        """Poll the container until Instagram has fetched and processed the image.
+        
+        Returns None once it can be published, or the failure result. Publishing
+        earlier fails while the container is still IN_PROGRESS; the caller's
+        timeout bounds the wait.
+        """
+        while True:
+            status_response = await self.client.get(
+                f"{self.base_url}/{container_id}",
+                params={"fields": "status_code,status", "access_token": user_access_token}
+            )
+            rate_limiter.observe("instagram", account_key(user_access_token), status_response.status_code, status_response.headers)
+            
+            if is_meta_rate_limited(status_response):
+                return meta_rate_limited_result("Instagram", status_response)
+            if status_response.status_code != 200:
+                return {
+                    "success": False,
+                    "platform": "Instagram",
+                    "error": status_response.text,
+                    "message": f"Failed to check the Instagram media container: {status_response.text}"
+                }
+            
+            container = status_response.json()
+            status_code = container.get("status_code")
+            if status_code in (None, "FINISHED", "PUBLISHED"):
+                return None
+            if status_code in ("ERROR", "EXPIRED"):
+                detail = container.get("status") or status_code
+                return {
+                    "success": False,
+                    "platform": "Instagram",
+                    "error": detail,
+                    "message": f"Instagram could not process the image: {detail}"
+                }
+            await asyncio.sleep(settings.instagram_container_poll_seconds)
+    
+    async def post_to_instagram(self, content: str, image_url: Optional[str] = None, user_access_token: Optional[str] = None) -> Dict:
+        """Post to Instagram: create the media container, wait until it is ready, publish it"""
         try:
             if not user_access_token:
                 return {
@@ -140,8 +297,11 @@ class InstagramIntegration:
                 "access_token": user_access_token
             }
             
-            container_response = requests.post(container_url, data=container_payload)
+            container_response = await self.client.post(container_url, data=container_payload)
+            rate_limiter.observe("instagram", account_key(user_access_token), container_response.status_code, container_response.headers)
             
+            if is_meta_rate_limited(container_response):
+                return meta_rate_limited_result("Instagram", container_response)
             if container_response.status_code != 200:
                 return {
                     "success": False,
@@ -151,6 +311,9 @@ class InstagramIntegration:
                 }
             
             container_id = container_response.json().get("id")
+            not_ready = await self.wait_for_container(container_id, user_access_token)
+            if not_ready is not None:
+                return not_ready
             
             # Step 2: Publish the media container
             publish_url = f"{self.base_url}/me/media_publish"
@@ -159,8 +322,11 @@ class InstagramIntegration:
                 "access_token": user_access_token
             }
             
-            publish_response = requests.post(publish_url, data=publish_payload)
+            publish_response = await self.client.post(publish_url, data=publish_payload)
+            rate_limiter.observe("instagram", account_key(user_access_token), publish_response.status_code, publish_response.headers)
             
+            if is_meta_rate_limited(publish_response):
+                return meta_rate_limited_result("Instagram", publish_response)
             if publish_response.status_code == 200:
                 return {
                     "success": True,
@@ -191,36 +357,101 @@ class SocialMediaPublisher:
         self.x_twitter = XTwitterIntegration()
         self.threads = ThreadsIntegration()
         self.instagram = InstagramIntegration()
+        # tweepy is blocking, so X calls run on a dedicated pool instead of the event loop
+        self._executor = ThreadPoolExecutor(max_workers=settings.publish_max_workers, thread_name_prefix="publish")
+    
+    async def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.x_twitter.close()
+        await self.threads.close()
+        await self.instagram.close()
     
-    def publish_to_platforms(self, content: str, platforms: List[str], 
-                            user_tokens: Optional[Dict[str, str]] = None,
-                            image_url: Optional[str] = None) -> List[Dict]:
-        """Publish content to multiple platforms"""
-        results = []
+    async def _run_with_timeout(self, platform_name: str, timeout: float, call_platform: Callable[[], Awaitable[Dict]]) -> Dict:
+        with track_outbound(platform_name.lower()) as call:
+            try:
+                result = await asyncio.wait_for(call_platform(), timeout)
+            except asyncio.TimeoutError:
+                call.outcome = "timeout"
+                # The request may still reach the platform (an X call keeps running on its thread)
+                return {
+                    "success": False,
+                    "platform": platform_name,
+                    "timed_out": True,
+                    "error": "Timed out",
+                    "message": f"Publishing to {platform_name} timed out after {timeout:g} seconds"
+                }
+            if result.get("success"):
+                call.outcome = "success"
+            else:
+                call.outcome = "rate_limited" if result.get("rate_limited") else "failure"
+            return result
+    
+    def _schedule(self, platform_key: str, platform_name: str, token: Optional[str], timeout: float,
+                  call_platform: Callable[[], Awaitable[Dict]]) -> Awaitable[Dict]:
+        """Queue the call behind the account's rate limit budget, each retry gets a fresh timeout"""
+        return rate_limiter.run(
+            platform_key, platform_name, account_key(token),
+            lambda: self._run_with_timeout(platform_name, timeout, call_platform)
+        )
+    
+    async def publish_to_platforms(self, content: str, platforms: List[str], 
+                                   user_tokens: Optional[Dict[str, str]] = None,
+                                   image_url: Optional[str] = None) -> List[Dict]:
+        """Publish content to multiple platforms concurrently, results keep the order of platforms"""
+        loop = asyncio.get_running_loop()
+        tasks = []
         
         for platform in platforms:
             platform_lower = platform.lower()
             
             if platform_lower in ['x', 'twitter', 'x/twitter']:
-                result = self.x_twitter.post_tweet(content)
-                results.append(result)
+                tasks.append(self._schedule(
+                    "x", "X/Twitter", None, settings.x_publish_timeout_seconds,
+                    lambda: loop.run_in_executor(self._executor, self.x_twitter.post_tweet, content)
+                ))
             
             elif platform_lower in ['threads']:
                 token = user_tokens.get('threads') if user_tokens else None
-                result = self.threads.post_thread(content, token)
-                results.append(result)
+                tasks.append(self._schedule(
+                    "threads", "Threads", token, settings.threads_publish_timeout_seconds,
+                    lambda token=token: self.threads.post_thread(content, token)
+                ))
             
             elif platform_lower in ['instagram']:
                 token = user_tokens.get('instagram') if user_tokens else None
-                result = self.instagram.post_to_instagram(content, image_url, token)
-                results.append(result)
+                # Both Graph API steps share the budget of the whole Instagram publish
+                tasks.append(self._schedule(
+                    "instagram", "Instagram", token, settings.instagram_publish_timeout_seconds,
+                    lambda token=token: self.instagram.post_to_instagram(content, image_url, token)
+                ))
             
             else:
-                results.append({
-                    "success": False,
-                    "platform": platform,
-                    "error": f"Unsupported platform: {platform}",
-                    "message": f"Platform {platform} is not supported yet"
-                })
+                tasks.append(self._unsupported_platform(platform))
         
-        return results
+        return list(await asyncio.gather(*tasks))
+    
+    async def _unsupported_platform(self, platform: str) -> Dict:
+        return {
+            "success": False,
+            "platform": platform,
+            "error": f"Unsupported platform: {platform}",
+            "message": f"Platform {platform} is not supported yet"
+        }
+
+
+_publisher: Optional[SocialMediaPublisher] = None
+
+
+def get_publisher() -> SocialMediaPublisher:
+    """Application-lifetime publisher, its clients keep connections to each platform alive"""
+    global _publisher
+    if _publisher is None:
+        _publisher = SocialMediaPublisher()
+    return _publisher
+
+
+async def close_publisher():
+    global _publisher
+    if _publisher is not None:
+        await _publisher.close()
+        _publisher = None
@@ -0,0 +1,151 @@
+"""Shared cache backend benchmark and coherence check.
+
+For each backend a second worker process keeps a local copy of a key, this
+process deletes it, and the time until the other worker has dropped its copy is
+measured. Also reports the cost of shared reads and writes:
+
+    cd backend
+    python -m benchmarks.cache --operations 2000
+
+The redis backend runs against benchmarks/fake_redis.py unless --redis-url
+points at a real server.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+
+def configure(backend: str, sqlite_path: str, redis_url: str):
+    os.environ.update({
+        "CACHE_BACKEND": backend,
+        "CACHE_SQLITE_PATH": sqlite_path,
+        "CACHE_REDIS_URL": redis_url,
+        "CACHE_LOCAL_TTL_SECONDS": "60",
+        "CACHE_INVALIDATION_POLL_SECONDS": "0.05",
+    })
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/cache.db")
+
+
+def worker(connection, backend: str, sqlite_path: str, redis_url: str):
+    """The other uvicorn worker: reads on request and reports when its local copy is dropped"""
+    configure(backend, sqlite_path, redis_url)
+    from app.cache import Cache, invalidation_listener
+
+    async def serve():
+        cache = Cache("bench", 300, 1000)
+        invalidation_listener.start()
+        await asyncio.sleep(0.2)
+        connection.send("ready")
+        while True:
+            command, key = await asyncio.to_thread(connection.recv)
+            if command == "get":
+                connection.send(await cache.get(key))
+            elif command == "wait_dropped":
+                started = time.perf_counter()
+                while cache._local_get(key)[0] and time.perf_counter() - started < 5:
+                    await asyncio.sleep(0.001)
+                connection.send((time.perf_counter() - started) * 1000)
+            elif command == "stop":
+                await invalidation_listener.stop()
+                return
+
+    asyncio.run(serve())
+
+
+async def measure(backend: str, args) -> dict:
+    from app import cache as cache_module
+    from app.config import settings
+
+    settings.cache_backend = backend
+    settings.cache_sqlite_path = args.sqlite_path
+    settings.cache_redis_url = args.redis_url
+    settings.cache_local_ttl_seconds = 60
+    cache_module._backend = None
+    cache = cache_module.Cache("bench", 300, 1000)
+
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe()
+    process = context.Process(target=worker, args=(child, backend, args.sqlite_path, args.redis_url))
+    process.start()
+    parent.recv()
+
+    row = {"backend": backend}
+    try:
+        value = {"content": "Small habits compound.", "hashtags": ["#growth"]}
+        await cache.set("post", value)
+        parent.send(("get", "post"))
+        row["other worker sees set"] = parent.recv() == value
+        parent.send(("get", "post"))
+        parent.recv()
+
+        started = time.perf_counter()
+        await cache.delete("post")
+        row["delete ms"] = (time.perf_counter() - started) * 1000
+        parent.send(("wait_dropped", "post"))
+        row["propagation ms"] = parent.recv()
+        parent.send(("get", "post"))
+        row["coherent after delete"] = parent.recv() is None
+
+        shared = cache_module.get_backend()
+        if shared is not None:
+            started = time.perf_counter()
+            for number in range(args.operations):
+                await shared.set(f"bench-{number}", b'{"content": "x"}', 60)
+            row["set us"] = (time.perf_counter() - started) * 1e6 / args.operations
+            started = time.perf_counter()
+            for number in range(args.operations):
+                await shared.get(f"bench-{number}")
+            row["shared get us"] = (time.perf_counter() - started) * 1e6 / args.operations
+        started = time.perf_counter()
+        for _ in range(args.operations):
+            await cache.get("missing")
+        row["miss us"] = (time.perf_counter() - started) * 1e6 / args.operations
+    finally:
+        parent.send(("stop", None))
+        process.join(timeout=10)
+        await cache_module.close_cache()
+    return row
+
+
+async def run(args):
+    rows = []
+    for backend in args.backends:
+        rows.append(await measure(backend, args))
+
+    columns = ["backend", "other worker sees set", "coherent after delete", "propagation ms",
+               "delete ms", "set us", "shared get us", "miss us"]
+    print("  ".join(f"{column:>22}" for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column, "-")
+            cells.append(f"{value:>22.2f}" if isinstance(value, float) else f"{str(value):>22}")
+        print("  ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+    args.sqlite_path = os.path.join(tempfile.mkdtemp(), "cache.db")
+
+    configure("memory", args.sqlite_path, args.redis_url)
+    if "redis" in args.backends and not args.redis_url:
+        from .fake_redis import FakeRedisServer
+
+        with FakeRedisServer(port=6391) as server:
+            args.redis_url = server.url
+            asyncio.run(run(args))
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
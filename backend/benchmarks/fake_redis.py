@@ -0,0 +1,280 @@
+"""Local stand-in for a Redis server.
+
+Speaks enough RESP2 for the cache backend (strings with expiry, DEL, pub/sub,
+MULTI/EXEC) so CACHE_BACKEND=redis can be exercised without a real server:
+
+    cd backend
+    python -m benchmarks.fake_redis --port 6390
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn app.main:app --workers 4
+
+Everything lives in one process's memory; it is a test fixture, not a store.
+"""
+import argparse
+import asyncio
+import fnmatch
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class CommandError(Exception):
+    pass
+
+
+class SimpleString(str):
+    pass
+
+
+OK = SimpleString("OK")
+QUEUED = SimpleString("QUEUED")
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, CommandError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, SimpleString):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, as typed into telnet
+        return line.split()
+    arguments = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        arguments.append((await reader.readexactly(length + 2))[:-2])
+    return arguments
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.channels: Dict[bytes, Set["Connection"]] = {}
+        self.commands = 0
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0]
+
+    def execute(self, connection: "Connection", arguments: List[bytes]):
+        self.commands += 1
+        name, arguments = arguments[0].decode().upper(), arguments[1:]
+        handler = getattr(self, f"command_{name.lower()}", None)
+        if handler is None:
+            return CommandError(f"ERR unknown command '{name}'")
+        try:
+            return handler(connection, *arguments)
+        except TypeError:
+            return CommandError(f"ERR wrong number of arguments for '{name.lower()}' command")
+
+    def command_ping(self, connection, message: bytes = None):
+        if connection.subscriptions:
+            return [b"pong", message or b""]
+        return message if message is not None else SimpleString("PONG")
+
+    def command_echo(self, connection, message: bytes):
+        return message
+
+    def command_hello(self, connection, protocol: bytes = b"2", *options: bytes):
+        if protocol != b"2":
+            return CommandError("NOPROTO unsupported protocol version")
+        return [b"server", b"redis", b"version", b"7.2.0", b"proto", 2, b"mode", b"standalone"]
+
+    def command_select(self, connection, index: bytes):
+        return OK
+
+    def command_client(self, connection, *arguments):
+        return OK
+
+    def command_info(self, connection, *sections):
+        return b"# Server\r\nredis_version:7.2.0\r\nredis_mode:standalone\r\n"
+
+    def command_get(self, connection, key: bytes):
+        return self._live(key)
+
+    def command_set(self, connection, key: bytes, value: bytes, *options: bytes):
+        expires_at = None
+        options = [option.upper() for option in options]
+        index = 0
+        while index < len(options):
+            option = options[index]
+            if option in (b"EX", b"PX"):
+                amount = float(options[index + 1])
+                expires_at = time.monotonic() + (amount if option == b"EX" else amount / 1000)
+                index += 1
+            elif option == b"NX" and self._live(key) is not None:
+                return None
+            elif option == b"XX" and self._live(key) is None:
+                return None
+            index += 1
+        self.data[key] = (value, expires_at)
+        return OK
+
+    def command_del(self, connection, *keys: bytes):
+        return sum(1 for key in keys if self._live(key) is not None and self.data.pop(key, None) is not None)
+
+    def command_exists(self, connection, *keys: bytes):
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    def command_pttl(self, connection, key: bytes):
+        if self._live(key) is None:
+            return -2
+        expires_at = self.data[key][1]
+        return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+
+    def command_keys(self, connection, pattern: bytes):
+        return [key for key in list(self.data) if self._live(key) is not None and fnmatch.fnmatchcase(key, pattern)]
+
+    def command_dbsize(self, connection):
+        return sum(1 for key in list(self.data) if self._live(key) is not None)
+
+    def command_flushdb(self, connection, *options):
+        self.data.clear()
+        return OK
+
+    command_flushall = command_flushdb
+
+    def command_publish(self, connection, channel: bytes, message: bytes):
+        subscribers = list(self.channels.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.push([b"message", channel, message])
+        return len(subscribers)
+
+    def command_subscribe(self, connection, *channels: bytes):
+        for channel in channels:
+            self.channels.setdefault(channel, set()).add(connection)
+            connection.subscriptions.add(channel)
+            connection.push([b"subscribe", channel, len(connection.subscriptions)])
+
+    def command_unsubscribe(self, connection, *channels: bytes):
+        for channel in channels or list(connection.subscriptions):
+            self.channels.get(channel, set()).discard(connection)
+            connection.subscriptions.discard(channel)
+            connection.push([b"unsubscribe", channel, len(connection.subscriptions)])
+
+    def command_multi(self, connection):
+        connection.queued = []
+        return OK
+
+    def command_discard(self, connection):
+        connection.queued = None
+        return OK
+
+    def command_exec(self, connection):
+        if connection.queued is None:
+            return CommandError("ERR EXEC without MULTI")
+        queued, connection.queued = connection.queued, None
+        return [self.execute(connection, arguments) for arguments in queued]
+
+
+class Connection:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subscriptions: Set[bytes] = set()
+        self.queued: Optional[List[List[bytes]]] = None
+
+    def push(self, value):
+        self.writer.write(encode(value))
+
+
+async def serve_connection(store: FakeRedis, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    connection = Connection(writer)
+    try:
+        while True:
+            arguments = await read_command(reader)
+            if not arguments:
+                break
+            name = arguments[0].upper()
+            if name == b"QUIT":
+                connection.push(OK)
+                break
+            if connection.queued is not None and name not in (b"EXEC", b"DISCARD", b"MULTI"):
+                connection.queued.append(arguments)
+                connection.push(QUEUED)
+                continue
+            reply = store.execute(connection, arguments)
+            # (UN)SUBSCRIBE answer with one pushed message per channel instead
+            if name not in (b"SUBSCRIBE", b"UNSUBSCRIBE"):
+                connection.push(reply)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        for channel in connection.subscriptions:
+            store.channels.get(channel, set()).discard(connection)
+        writer.close()
+
+
+class FakeRedisServer:
+    """Runs the stand-in on a background thread with its own event loop"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390):
+        self.store = FakeRedis()
+        self.host = host
+        self.port = port
+        self.url = f"redis://{host}:{port}/0"
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(
+            lambda reader, writer: serve_connection(self.store, reader, writer), self.host, self.port
+        ))
+        self._server = server
+        self._started.set()
+        self._loop.run_forever()
+        server.close()
+        self._loop.run_until_complete(server.wait_closed())
+
+    def __enter__(self):
+        self._thread.start()
+        if not self._started.wait(timeout=10):
+            raise RuntimeError("Fake Redis did not start")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    async def serve():
+        store = FakeRedis()
+        server = await asyncio.start_server(
+            lambda reader, writer: serve_connection(store, reader, writer), args.host, args.port
+        )
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
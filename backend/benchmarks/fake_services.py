@@ -0,0 +1,189 @@
+"""Local stand-ins for Gemini, X, Threads and Instagram.
+
+One ASGI app answers the handful of endpoints the backend calls, with a
+configurable latency and error rate, so load tests never touch live services:
+
+    cd backend
+    python -m benchmarks.fake_services --port 9100 --latency-ms 150 --error-rate 0.02
+
+Point the backend at it with GEMINI_API_ENDPOINT, X_API_BASE_URL,
+THREADS_API_BASE_URL and INSTAGRAM_API_BASE_URL (see `backend_environment`).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SAMPLE_POST = "Small habits compound: ship one improvement today and watch what a month of them does for your team."
+SAMPLE_HASHTAGS = ["#productivity", "#teamwork", "#growth"]
+
+
+class FakeServiceConfig:
+    def __init__(self, latency_ms: float = 100.0, jitter_ms: float = 20.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+
+def create_fake_services_app(config: FakeServiceConfig) -> FastAPI:
+    app = FastAPI(title="Fake platform services")
+    ids = itertools.count(1)
+    app.state.calls = {}
+    app.state.container_polls = {}
+
+    async def simulate(name: str):
+        app.state.calls[name] = app.state.calls.get(name, 0) + 1
+        delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms))
+        await asyncio.sleep(delay / 1000)
+        if random.random() < config.error_rate:
+            return JSONResponse({"error": {"message": f"Injected {name} failure", "code": 500}}, status_code=500)
+        return None
+
+    def gemini_text(body: dict) -> str:
+        prompt = json.dumps(body)
+        if "JSON object" in prompt:
+            return json.dumps({"content": SAMPLE_POST, "hashtags": SAMPLE_HASHTAGS})
+        if "hashtags" in prompt and "Generate 3-5" in prompt:
+            return " ".join(SAMPLE_HASHTAGS)
+        return SAMPLE_POST
+
+    def gemini_candidate(text: str) -> dict:
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 50, "candidatesTokenCount": 40, "totalTokenCount": 90},
+        }
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        body = await request.json()
+        error = await simulate("gemini")
+        return error or gemini_candidate(gemini_text(body))
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request):
+        body = await request.json()
+        error = await simulate("gemini_stream")
+        if error:
+            return error
+        words = gemini_text(body).split(" ")
+        chunks = [gemini_candidate(" ".join(words[index:index + 4]) + " ") for index in range(0, len(words), 4)]
+
+        # alt=sse is Server-Sent Events, without it the REST client expects a streamed JSON array
+        if request.query_params.get("alt") == "sse":
+            async def events():
+                for chunk in chunks:
+                    yield f"data: {json.dumps(chunk)}\r\n\r\n"
+                    await asyncio.sleep(config.latency_ms / 10000)
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        async def array():
+            for index, chunk in enumerate(chunks):
+                yield ("[" if index == 0 else ",\r\n") + json.dumps(chunk)
+                await asyncio.sleep(config.latency_ms / 10000)
+            yield "]"
+
+        return StreamingResponse(array(), media_type="application/json")
+
+    @app.post("/2/tweets")
+    async def create_tweet(request: Request):
+        body = await request.json()
+        error = await simulate("x")
+        return error or JSONResponse({"data": {"id": str(next(ids)), "text": body.get("text", "")}}, status_code=201)
+
+    @app.post("/threads/me/threads")
+    async def create_thread():
+        error = await simulate("threads")
+        return error or {"id": str(next(ids))}
+
+    @app.post("/instagram/me/media")
+    async def create_media_container():
+        error = await simulate("instagram_container")
+        return error or {"id": str(next(ids))}
+
+    @app.get("/instagram/{container_id}")
+    async def media_container_status(container_id: str):
+        # Processing takes one status check, like a small image on the real API
+        polls = app.state.container_polls
+        polls[container_id] = polls.get(container_id, 0) + 1
+        error = await simulate("instagram_status")
+        return error or {"id": container_id, "status_code": "FINISHED" if polls[container_id] > 1 else "IN_PROGRESS"}
+
+    @app.post("/instagram/me/media_publish")
+    async def publish_media_container():
+        error = await simulate("instagram_publish")
+        return error or {"id": str(next(ids))}
+
+    @app.get("/calls")
+    async def calls():
+        return app.state.calls
+
+    return app
+
+
+def backend_environment(base_url: str) -> dict:
+    """Environment variables pointing the backend at a fake services instance"""
+    return {
+        "GEMINI_API_KEY": "fake-gemini-key",
+        "GEMINI_TRANSPORT": "rest",
+        "GEMINI_API_ENDPOINT": base_url,
+        "X_API_KEY": "fake",
+        "X_API_SECRET": "fake",
+        "X_ACCESS_TOKEN": "fake",
+        "X_ACCESS_TOKEN_SECRET": "fake",
+        "X_API_BASE_URL": base_url,
+        "THREADS_API_BASE_URL": f"{base_url}/threads",
+        "INSTAGRAM_API_BASE_URL": f"{base_url}/instagram",
+        # The stand-ins never throttle, keep local pacing out of the measurements
+        "PUBLISH_RATE_LIMIT_BURST": "1000",
+        "PUBLISH_RATE_LIMIT_PER_SECOND": "1000",
+    }
+
+
+class FakeServicesServer:
+    """Runs the fake services with uvicorn on a background thread"""
+
+    def __init__(self, config: FakeServiceConfig, host: str = "127.0.0.1", port: int = 9100):
+        import uvicorn
+
+        self.app = create_fake_services_app(config)
+        self.base_url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake services did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeServiceConfig(args.latency_ms, args.jitter_ms, args.error_rate)
+    uvicorn.run(create_fake_services_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
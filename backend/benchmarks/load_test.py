@@ -0,0 +1,184 @@
+"""Offline load test for the API.
+
+Starts the local platform stand-ins from `fake_services`, points the backend
+at them, then drives the FastAPI app in-process with a weighted mix of
+operations from concurrent virtual users. Reports per-operation throughput,
+latency percentiles and database queries per request.
+
+    cd backend
+    python -m benchmarks.load_test --users 20 --duration 30 \\
+        --mix login=1,list=6,generate=2,publish=1 --latency-ms 150 --error-rate 0.01
+
+Without DATABASE_URL a throwaway SQLite database is used; set it to run
+against PostgreSQL instead.
+"""
+import argparse
+import asyncio
+import contextvars
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from .fake_services import FakeServiceConfig, FakeServicesServer, backend_environment
+
+_query_counter: contextvars.ContextVar = contextvars.ContextVar("query_counter", default=None)
+
+TOPICS = ["remote work", "product launches", "AI in marketing", "team rituals", "customer stories"]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class OperationStats:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors = 0
+        self.queries = 0
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - {"login", "list", "generate", "publish"}
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def install_query_counter(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_query(*args):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+async def seed_user(client, index: int) -> Dict:
+    from sqlalchemy import update
+    from app.database import AsyncSessionLocal
+    from app.models import SocialAccount
+
+    credentials = {"email": f"load{index}@example.com", "password": "load-test-password"}
+    await client.post("/api/auth/register", json={**credentials, "username": f"load{index}"})
+    token = (await client.post("/api/auth/login", json=credentials)).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for platform in ("threads", "instagram"):
+        await client.post("/api/social-accounts/", json={"platform": platform, "account_name": f"load{index}"}, headers=headers)
+    # Accounts are created without tokens through the API, give them fake ones
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(SocialAccount).where(SocialAccount.account_name == f"load{index}").values(access_token="fake-token"))
+        await db.commit()
+
+    post_ids = []
+    for number in range(20):
+        response = await client.post("/api/posts/", json={
+            "content": f"Seed post {number} for load user {index}",
+            "platforms": ["x", "threads"],
+        }, headers=headers)
+        post_ids.append(response.json()["id"])
+    return {"credentials": credentials, "headers": headers, "post_ids": post_ids}
+
+
+async def run_operation(client, name: str, user: Dict):
+    if name == "login":
+        return await client.post("/api/auth/login", json=user["credentials"])
+    if name == "list":
+        return await client.get("/api/posts/", headers=user["headers"])
+    if name == "generate":
+        return await client.post("/api/content/generate", json={
+            "topic": random.choice(TOPICS), "platform": random.choice(["x", "threads"]),
+        }, headers=user["headers"])
+    return await client.post(f"/api/posts/{random.choice(user['post_ids'])}/publish", headers=user["headers"])
+
+
+async def run(args):
+    import httpx
+    from app.database import async_engine
+    from app.main import app
+    from app.migrate import migrate
+
+    migrate()
+
+    install_query_counter(async_engine)
+    weights = parse_mix(args.mix)
+    names, name_weights = list(weights), list(weights.values())
+    stats = {name: OperationStats() for name in names}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=60) as client:
+        users = [await seed_user(client, index) for index in range(args.users)]
+        deadline = time.perf_counter() + args.duration
+
+        async def virtual_user(user):
+            while time.perf_counter() < deadline:
+                name = random.choices(names, name_weights)[0]
+                counter = [0]
+                token = _query_counter.set(counter)
+                started = time.perf_counter()
+                try:
+                    response = await run_operation(client, name, user)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                finally:
+                    _query_counter.reset(token)
+                operation = stats[name]
+                operation.latencies_ms.append((time.perf_counter() - started) * 1000)
+                operation.queries += counter[0]
+                operation.errors += failed
+                if args.think_ms:
+                    await asyncio.sleep(random.uniform(0, args.think_ms) / 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(user) for user in users))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.users} users for {elapsed:.1f}s, mix {args.mix}, upstream latency {args.latency_ms:g}ms, error rate {args.error_rate:g}")
+    print(f"{'operation':<10} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries/req':>12}")
+    total = 0
+    for name, operation in stats.items():
+        count = len(operation.latencies_ms)
+        total += count
+        print(
+            f"{name:<10} {count:>9} {count / elapsed:>8.1f} {operation.errors:>7} "
+            f"{percentile(operation.latencies_ms, 0.5):>8.1f} {percentile(operation.latencies_ms, 0.95):>8.1f} "
+            f"{percentile(operation.latencies_ms, 0.99):>8.1f} {operation.queries / count if count else 0:>12.2f}"
+        )
+    print(f"{'total':<10} {total:>9} {total / elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--mix", default="login=1,list=6,generate=2,publish=1")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="max random pause between a user's requests")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="fake upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake upstream calls that fail")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/load_test.db"
+
+    config = FakeServiceConfig(args.latency_ms, args.jitter_ms, args.error_rate)
+    with FakeServicesServer(config, port=args.fake_port) as fake_services:
+        os.environ.update(backend_environment(fake_services.base_url))
+        asyncio.run(run(args))
+        print(f"upstream calls: {fake_services.app.state.calls}")
+
+
+if __name__ == "__main__":
+    main()
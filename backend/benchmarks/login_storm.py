@@ -0,0 +1,92 @@
+"""Login storm benchmark.
+
+Fires concurrent logins at the API while probing an unrelated endpoint and
+reports login throughput together with the probe latency percentiles, which
+show how much the storm starves ordinary traffic on the same event loop.
+
+    cd backend
+    python -m benchmarks.login_storm --logins 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+    from app.migrate import migrate
+
+    migrate()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"email": "storm@example.com", "password": "benchmark-password"}
+        await client.post("/api/auth/register", json={**credentials, "username": "storm"})
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        statuses = {}
+
+        async def login():
+            async with semaphore:
+                response = await client.post("/api/auth/login", json=credentials)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        probe_latencies = []
+        storm_done = asyncio.Event()
+
+        async def probe():
+            while not storm_done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(args.probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        storm_done.set()
+        await probe_task
+
+    print(f"logins:            {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s)")
+    print(f"login statuses:    {dict(sorted(statuses.items()))}")
+    print(f"probe requests:    {len(probe_latencies)}")
+    print(f"probe p50 latency: {percentile(probe_latencies, 0.5):.2f} ms")
+    print(f"probe p99 latency: {percentile(probe_latencies, 0.99):.2f} ms")
+    print(f"probe max latency: {max(probe_latencies, default=0.0):.2f} ms")
+    if probe_latencies:
+        print(f"probe mean:        {statistics.mean(probe_latencies):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe-interval", type=float, default=0.005)
+    parser.add_argument("--workers", type=int, help="override PASSWORD_HASH_WORKERS")
+    parser.add_argument("--max-queue", type=int, help="override PASSWORD_HASH_MAX_QUEUE")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/login_storm.db"
+    if args.workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    if args.max_queue is not None:
+        os.environ["PASSWORD_HASH_MAX_QUEUE"] = str(args.max_queue)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Full-text search benchmark.
+
+Seeds one account with many posts built from a fixed vocabulary (plus a few
+other accounts), then times `GET /api/posts/search` in-process for common,
+rare, prefix and hashtag-filtered queries:
+
+    cd backend
+    python -m benchmarks.search --posts 100000 --requests 50
+
+Without DATABASE_URL a throwaway SQLite database (FTS5) is used; point it at
+PostgreSQL to measure the tsvector/GIN path.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+VOCABULARY = (
+    "launch product team growth remote work ritual customer story feature release demo stream "
+    "habit ship improvement month week quarter roadmap hiring culture design research marketing "
+    "community event webinar podcast newsletter pricing onboarding retention analytics automation"
+).split()
+HASHTAGS = ["#growth", "#launch", "#remote", "#product", "#marketing", "#hiring"]
+
+QUERIES = [
+    ("common word", {"q": "launch"}),
+    ("two words", {"q": "customer story"}),
+    ("prefix", {"q": "onboard"}),
+    ("rare word", {"q": "zeppelin"}),
+    ("word + hashtag", {"q": "release", "hashtag": "#product"}),
+]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def seed_posts(user_id: int, count: int, rng: random.Random):
+    from sqlalchemy import insert
+    from app.database import engine
+    from app.models import Post
+
+    now = datetime.utcnow()
+    batch = []
+    with engine.begin() as connection:
+        for number in range(count):
+            words = rng.sample(VOCABULARY, 12)
+            if number % 1000 == 0:
+                words.append("zeppelin")
+            batch.append({
+                "user_id": user_id,
+                "content": " ".join(words),
+                "hashtags": rng.sample(HASHTAGS, 2),
+                "platforms": ["x"],
+                "status": "draft",
+                "created_at": now,
+                "updated_at": now,
+            })
+            if len(batch) == 5000:
+                connection.execute(insert(Post), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Post), batch)
+
+
+async def run(args):
+    import httpx
+    from app.migrate import migrate
+    from app.main import app
+
+    migrate()
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        credentials = {"email": "search@example.com", "password": "search-password"}
+        user = (await client.post("/api/auth/register", json={**credentials, "username": "search"})).json()
+        token = (await client.post("/api/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        started = time.perf_counter()
+        seed_posts(user["id"], args.posts, rng)
+        seed_posts(user["id"] + 1000, args.posts // 10, rng)
+        print(f"seeded {args.posts} posts in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':<16}{'results':>8}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, params in QUERIES:
+            params = {**params, "limit": args.limit}
+            latencies = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                response = await client.get("/api/posts/search", params=params, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+            results = len(response.json())
+            print(f"{name:<16}{results:>8}{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/search.db"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
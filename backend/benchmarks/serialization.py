@@ -0,0 +1,155 @@
+"""Response serialization and compression benchmark.
+
+Measures CPU time per response for a large `GET /api/posts` page in each
+encoding mode, in-process through the full middleware stack:
+
+    cd backend
+    python -m benchmarks.serialization --posts 200 --requests 200
+
+Modes:
+  validated   rows validated through PostResponse, stdlib JSON (FAST_SERIALIZATION=false)
+  fast        trusted rows to dicts, orjson when installed
+  fast+gzip   fast, gzip negotiated
+  fast+br     fast, brotli negotiated (only with the brotli package installed)
+
+A second table isolates the encoding step itself: ORM objects validated with
+from_attributes and encoded by FastAPI's jsonable_encoder and the stdlib, as
+response_model does, against plain rows encoded by orjson.
+
+Without DATABASE_URL a throwaway SQLite database is used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+
+def cpu_ms(function, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return (time.process_time() - started) * 1000 / repeat
+
+
+async def seed(client, posts: int) -> dict:
+    credentials = {"email": "serialize@example.com", "password": "serialize-password"}
+    await client.post("/api/auth/register", json={**credentials, "username": "serialize"})
+    token = (await client.post("/api/auth/login", json=credentials)).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    await client.post("/api/posts/bulk", json={"items": [
+        {
+            "content": f"Post {number}: small habits compound, ship one improvement today and see what a month does.",
+            "hashtags": ["#productivity", "#teamwork", "#growth"],
+            "platforms": ["x", "threads", "instagram"],
+        }
+        for number in range(posts)
+    ]}, headers=headers)
+    return headers
+
+
+async def measure_endpoint(client, headers: dict, args) -> list:
+    from app import compression
+    from app.config import settings
+
+    modes = [
+        ("validated", False, False, "identity"),
+        ("fast", True, False, "identity"),
+        ("fast+gzip", True, True, "gzip"),
+    ]
+    if compression.brotli is not None:
+        modes.append(("fast+br", True, True, "br"))
+
+    rows = []
+    url = f"/api/posts/?limit={args.posts}"
+    for name, fast, compress, encoding in modes:
+        settings.fast_serialization = fast
+        settings.response_compression_enabled = compress
+        request_headers = {**headers, "Accept-Encoding": encoding}
+        for _ in range(10):
+            await client.get(url, headers=request_headers)
+
+        wire_bytes = 0
+        started_cpu, started_wall = time.process_time(), time.perf_counter()
+        for _ in range(args.requests):
+            response = await client.get(url, headers=request_headers)
+            wire_bytes = int(response.headers.get("content-length", len(response.content)))
+        cpu = (time.process_time() - started_cpu) * 1000 / args.requests
+        wall = (time.perf_counter() - started_wall) * 1000 / args.requests
+        rows.append((name, cpu, wall, wire_bytes))
+    settings.fast_serialization = True
+    settings.response_compression_enabled = True
+    return rows
+
+
+async def measure_encoding(args) -> list:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from app import serialization
+    from app.database import AsyncSessionLocal
+    from app.models import Post
+    from app.schemas import PostResponse
+
+    async with AsyncSessionLocal() as db:
+        objects = (await db.execute(select(Post).limit(args.posts))).scalars().all()
+        records = (await db.execute(
+            select(*serialization.response_columns(Post, PostResponse)).limit(args.posts)
+        )).all()
+
+    adapter = TypeAdapter(list[PostResponse])
+
+    def response_model_path():
+        validated = adapter.validate_python(objects, from_attributes=True)
+        json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+    def fast_path():
+        content = [dict(record._mapping) for record in records]
+        if serialization.orjson is not None:
+            serialization.orjson.dumps(content)
+        else:
+            json.dumps(jsonable_encoder(content)).encode("utf-8")
+
+    repeat = max(20, args.requests)
+    return [
+        ("response_model + json", cpu_ms(response_model_path, repeat)),
+        ("rows + orjson" if serialization.orjson is not None else "rows + json", cpu_ms(fast_path, repeat)),
+    ]
+
+
+async def run(args):
+    import httpx
+    from app.migrate import migrate
+    from app.main import app
+
+    migrate()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        headers = await seed(client, args.posts)
+        endpoint_rows = await measure_endpoint(client, headers, args)
+    encoding_rows = await measure_encoding(args)
+
+    print(f"GET /api/posts with {args.posts} posts, {args.requests} requests per mode")
+    print(f"{'mode':<12}{'cpu ms/resp':>13}{'wall ms/resp':>14}{'bytes':>10}")
+    for name, cpu, wall, wire_bytes in endpoint_rows:
+        print(f"{name:<12}{cpu:>13.2f}{wall:>14.2f}{wire_bytes:>10}")
+    print()
+    print(f"{'encoding only':<24}{'cpu ms':>10}")
+    for name, cpu in encoding_rows:
+        print(f"{name:<24}{cpu:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/serialization.db"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold start benchmark.
+
+Reports where `import app.main` spends its time (from `python -X importtime`)
+and how long a fresh uvicorn worker takes to answer its first request, which is
+what an autoscaled replica pays before it can take traffic:
+
+    cd backend
+    python -m benchmarks.startup --runs 5
+
+Without DATABASE_URL a throwaway SQLite database is used. Startup must not need
+the schema, so the database is deliberately left unmigrated.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+# Modules that must not be imported until first use
+LAZY_MODULES = ("tweepy", "requests", "google.generativeai", "grpc", "redis", "PIL")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_profile(env: dict):
+    """Run `import app.main` under -X importtime, returns (wall seconds, per top-level package microseconds, eager lazy modules)"""
+    check = f"import sys, app.main; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        env=env, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - started
+
+    self_times = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        self_times[name.strip().split(".")[0]] += int(self_us)
+    eager = [module for module in completed.stdout.strip().split(",") if module]
+    return wall, self_times, eager
+
+
+def time_to_first_request(env: dict) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + 60
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited before answering")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("No response within 60 seconds")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages to list in the import report")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/startup.db")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    import_walls, first_requests = [], []
+    totals = defaultdict(list)
+    eager = []
+    for _ in range(args.runs):
+        wall, self_times, eager = import_profile(env)
+        import_walls.append(wall)
+        for package, micros in self_times.items():
+            totals[package].append(micros)
+        first_requests.append(time_to_first_request(env))
+
+    print(f"{args.runs} runs, median of each")
+    print(f"import app.main (fresh interpreter)  {statistics.median(import_walls) * 1000:8.1f} ms")
+    print(f"time to first request (uvicorn)      {statistics.median(first_requests) * 1000:8.1f} ms")
+    print()
+    print(f"{'package':<28}{'import ms':>10}")
+    ranked = sorted(totals.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for package, samples in ranked[:args.top]:
+        print(f"{package:<28}{statistics.median(samples) / 1000:>10.1f}")
+    print()
+    print(f"SDKs imported at startup: {', '.join(eager) if eager else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
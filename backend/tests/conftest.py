@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+# Settings are read on import, point them at a throwaway database first
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.migrate import migrate
+    from app.main import app
+
+    migrate()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    email = f"user{os.urandom(4).hex()}@example.com"
+    client.post("/api/auth/register", json={"email": email, "username": email.split("@")[0], "password": "secret"})
+    token = client.post("/api/auth/login", json={"email": email, "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,42 @@
+import pytest
+from app import compression
+from app.compression import choose_encoding
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def test_refused_gzip_is_not_chosen_through_wildcard():
+    assert choose_encoding("gzip;q=0, *") is None
+
+
+def test_refused_gzip_with_brotli_accepted(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip;q=0, br, *") == "br"
+
+
+def test_wildcard_accepts_gzip(without_brotli):
+    assert choose_encoding("*") == "gzip"
+    assert choose_encoding("identity, *;q=0.5") == "gzip"
+
+
+def test_refused_wildcard():
+    assert choose_encoding("*;q=0") is None
+    assert choose_encoding("gzip;q=0.5, *;q=0") == "gzip"
+
+
+def test_brotli_preferred_when_available(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+
+
+def test_gzip_without_brotli(without_brotli):
+    assert choose_encoding("gzip, deflate, br") == "gzip"
+
+
+def test_nothing_acceptable():
+    assert choose_encoding("") is None
+    assert choose_encoding("identity, deflate") is None
+    assert choose_encoding("gzip;q=invalid") is None
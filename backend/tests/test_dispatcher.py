@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime
+
+
+class FakePublisher:
+    async def publish_to_platforms(self, content, platforms, user_tokens=None, image_url=None):
+        if content.startswith("Limited"):
+            return [{"success": False, "platform": platform, "rate_limited": True, "error": "429"} for platform in platforms]
+        return [{"success": True, "platform": platform, "post_id": "1"} for platform in platforms]
+
+
+def test_rate_limited_posts_do_not_starve_due_posts(client, auth_headers, monkeypatch):
+    from app import publishing
+    from app.dispatcher import ScheduledPostDispatcher
+
+    monkeypatch.setattr(publishing, "get_publisher", lambda: FakePublisher())
+    # Ordered ahead of everything else so the dispatcher claims them first
+    limited = [
+        client.post(
+            "/api/posts/",
+            json={"content": f"Limited {minute}", "platforms": ["threads"], "scheduled_time": f"2000-01-01T00:0{minute}:00Z"},
+            headers=auth_headers
+        ).json()
+        for minute in range(3)
+    ]
+    due = client.post(
+        "/api/posts/",
+        json={"content": "Due", "platforms": ["threads"], "scheduled_time": "2000-01-01T00:03:00Z"},
+        headers=auth_headers
+    ).json()
+
+    dispatcher = ScheduledPostDispatcher(batch_size=2)
+    # Only posts that were published or failed count towards a full batch
+    assert asyncio.run(dispatcher.run_once()) == 0
+    asyncio.run(dispatcher.run_once())
+
+    assert client.get(f"/api/posts/{due['id']}", headers=auth_headers).json()["status"] == "published"
+    for post in limited:
+        post = client.get(f"/api/posts/{post['id']}", headers=auth_headers).json()
+        assert post["status"] == "scheduled"
+        # Moved to when its leg may be retried, so it is not claimed again before then
+        assert datetime.fromisoformat(post["scheduled_time"]) > datetime.utcnow()
+    assert dispatcher.metrics.requeued == 3
@@ -0,0 +1,44 @@
+def test_create_with_utc_designator(client, auth_headers):
+    response = client.post(
+        "/api/posts/", json={"content": "Launch day", "scheduled_time": "2026-10-01T09:00:00Z"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["scheduled_time"] == "2026-10-01T09:00:00"
+
+
+def test_offsets_are_stored_as_utc(client, auth_headers):
+    post = client.post("/api/posts/", json={"content": "Offset"}, headers=auth_headers).json()
+    response = client.patch(
+        f"/api/posts/{post['id']}", json={"scheduled_time": "2026-10-01T11:00:00+02:00"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["scheduled_time"] == "2026-10-01T09:00:00"
+
+
+def test_bulk_writes_with_utc_designator(client, auth_headers):
+    created = client.post(
+        "/api/posts/bulk",
+        json={"items": [{"content": "Bulk", "scheduled_time": "2026-10-02T09:00:00Z"}]},
+        headers=auth_headers
+    ).json()
+    post_id = created["results"][0]["id"]
+    updated = client.patch(
+        "/api/posts/bulk",
+        json={"items": [{"id": post_id, "scheduled_time": "2026-10-03T09:00:00.000Z"}]},
+        headers=auth_headers
+    )
+    assert updated.status_code == 200
+    assert client.get(f"/api/posts/{post_id}", headers=auth_headers).json()["scheduled_time"] == "2026-10-03T09:00:00"
+
+
+def test_scheduled_range_with_utc_designator(client, auth_headers):
+    for day in ("2026-11-30T23:00:00Z", "2026-12-01T09:00:00Z", "2027-01-01T00:00:00Z"):
+        client.post("/api/posts/", json={"content": f"At {day}", "scheduled_time": day}, headers=auth_headers)
+    # What the Calendar sends for December, the month start in UTC+1
+    response = client.get(
+        "/api/posts/",
+        params={"scheduled_from": "2026-11-30T23:00:00.000Z", "scheduled_to": "2026-12-31T23:00:00.000Z"},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert sorted(post["scheduled_time"] for post in response.json()) == ["2026-11-30T23:00:00", "2026-12-01T09:00:00"]
@@ -0,0 +1,26 @@
+import time
+
+
+def test_timed_out_leg_is_not_published_again(client, auth_headers, monkeypatch):
+    from app.config import settings
+    from app.social_media_integrations import XTwitterIntegration
+
+    calls = []
+
+    def slow_tweet(self, content):
+        calls.append(content)
+        time.sleep(0.5)
+        return {"success": True, "platform": "X/Twitter", "post_id": "1"}
+
+    monkeypatch.setattr(XTwitterIntegration, "post_tweet", slow_tweet)
+    monkeypatch.setattr(settings, "x_publish_timeout_seconds", 0.05)
+    post = client.post("/api/posts/", json={"content": "Slow", "platforms": ["x"]}, headers=auth_headers).json()
+
+    response = client.post(f"/api/posts/{post['id']}/publish", headers=auth_headers).json()
+    assert response["post"]["status"] != "failed"
+    attempt, = client.get(f"/api/posts/{post['id']}/publish-attempts", headers=auth_headers).json()
+    # The tweet may still go out, the leg waits for the reconciler instead of counting as failed
+    assert attempt["state"] == "in_progress"
+
+    client.post(f"/api/posts/{post['id']}/publish", headers=auth_headers)
+    assert calls == ["Slow"]
@@ -6,19 +6,31 @@ import { Calendar as CalendarIcon } from 'lucide-react';
 import CalendarComponent from 'react-calendar';
 import 'react-calendar/dist/Calendar.css';
 
+const monthStart = (date) => new Date(date.getFullYear(), date.getMonth(), 1);
+
 export default function Calendar() {
   const [posts, setPosts] = useState([]);
   const [selectedDate, setSelectedDate] = useState(new Date());
+  const [activeMonth, setActiveMonth] = useState(() => monthStart(new Date()));
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     loadPosts();
-  }, []);
+  }, [activeMonth]);
+
+  // Only the posts scheduled in the month on screen
+  const monthParams = () => {
+    const nextMonth = new Date(activeMonth.getFullYear(), activeMonth.getMonth() + 1, 1);
+    return { scheduled_from: activeMonth.toISOString(), scheduled_to: nextMonth.toISOString() };
+  };
 
   const loadPosts = async () => {
     try {
-      const response = await postsAPI.getAll();
-      setPosts(response.data.filter(p => p.scheduled_time));
+      const response = await postsAPI.getPage(monthParams());
+      setPosts(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error loading posts:', error);
     } finally {
@@ -26,6 +38,19 @@ export default function Calendar() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await postsAPI.getPage({ ...monthParams(), cursor: nextCursor });
+      setPosts((loaded) => [...loaded, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error loading posts:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getPostsForDate = (date) => {
     return posts.filter(post => {
       if (!post.scheduled_time) return false;
@@ -74,8 +99,20 @@ export default function Calendar() {
                   onChange={setSelectedDate}
                   value={selectedDate}
                   tileContent={tileContent}
+                  onActiveStartDateChange={({ activeStartDate, view }) => {
+                    if (view === 'month') setActiveMonth(monthStart(activeStartDate));
+                  }}
                   className="w-full border-none"
                 />
+                {nextCursor && (
+                  <button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="mt-4 w-full px-4 py-2 border rounded-lg hover:bg-gray-50 disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more posts for this month'}
+                  </button>
+                )}
               </div>
 
               <div className="bg-white rounded-lg shadow p-6">
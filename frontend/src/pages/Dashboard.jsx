@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { socialAccountsAPI, postsAPI } from '../services/api';
+import { socialAccountsAPI, postsAPI, analyticsAPI } from '../services/api';
 import Navbar from '../components/Navbar';
 import Sidebar from '../components/Sidebar';
 import { Plus, Twitter, Facebook, Instagram, Linkedin, Calendar, FileText } from 'lucide-react';
@@ -17,6 +17,7 @@ export default function Dashboard() {
   const { user } = useAuth();
   const [socialAccounts, setSocialAccounts] = useState([]);
   const [posts, setPosts] = useState([]);
+  const [postCounts, setPostCounts] = useState({ total: 0, scheduled: 0 });
   const [showAddAccount, setShowAddAccount] = useState(false);
   const [newAccount, setNewAccount] = useState({ platform: 'twitter', account_name: '' });
   const [loading, setLoading] = useState(true);
@@ -27,12 +28,17 @@ export default function Dashboard() {
 
   const loadData = async () => {
     try {
-      const [accountsRes, postsRes] = await Promise.all([
+      const [accountsRes, postsRes, summaryRes] = await Promise.all([
         socialAccountsAPI.getAll(),
-        postsAPI.getAll(),
+        postsAPI.getPage({ limit: 5 }),
+        analyticsAPI.getSummary({ days: 1 }),
       ]);
       setSocialAccounts(accountsRes.data);
       setPosts(postsRes.data);
+      setPostCounts({
+        total: summaryRes.data.total_posts,
+        scheduled: summaryRes.data.by_status.scheduled || 0,
+      });
     } catch (error) {
       console.error('Error loading data:', error);
     } finally {
@@ -97,7 +103,7 @@ export default function Dashboard() {
                 <div className="flex items-center justify-between">
                   <div>
                     <p className="text-gray-600 text-sm">Total Posts</p>
-                    <p className="text-3xl font-bold text-green-600">{posts.length}</p>
+                    <p className="text-3xl font-bold text-green-600">{postCounts.total}</p>
                   </div>
                   <div className="bg-green-100 rounded-full p-3">
                     <FileText className="h-6 w-6 text-green-600" />
@@ -109,9 +115,7 @@ export default function Dashboard() {
                 <div className="flex items-center justify-between">
                   <div>
                     <p className="text-gray-600 text-sm">Scheduled</p>
-                    <p className="text-3xl font-bold text-purple-600">
-                      {posts.filter(p => p.status === 'scheduled').length}
-                    </p>
+                    <p className="text-3xl font-bold text-purple-600">{postCounts.scheduled}</p>
                   </div>
                   <div className="bg-purple-100 rounded-full p-3">
                     <Calendar className="h-6 w-6 text-purple-600" />
@@ -210,7 +214,7 @@ export default function Dashboard() {
                   {posts.length === 0 ? (
                     <p className="text-gray-500 text-center py-4">No posts yet</p>
                   ) : (
-                    posts.slice(0, 5).map((post) => (
+                    posts.map((post) => (
                       <div key={post.id} className="p-3 border rounded-lg hover:bg-gray-50">
                         <p className="text-sm text-gray-800 line-clamp-2">{post.content}</p>
                         <div className="flex items-center justify-between mt-2">
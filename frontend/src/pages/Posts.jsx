@@ -7,6 +7,8 @@ import { FileText, Trash2, Send } from 'lucide-react';
 export default function Posts() {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedPost, setSelectedPost] = useState(null);
 
   useEffect(() => {
@@ -15,8 +17,9 @@ export default function Posts() {
 
   const loadPosts = async () => {
     try {
-      const response = await postsAPI.getAll();
+      const response = await postsAPI.getPage();
       setPosts(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error loading posts:', error);
     } finally {
@@ -24,6 +27,19 @@ export default function Posts() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await postsAPI.getPage({ cursor: nextCursor });
+      setPosts((loaded) => [...loaded, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error loading posts:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (id) => {
     if (window.confirm('Are you sure you want to delete this post?')) {
       try {
@@ -143,6 +159,18 @@ export default function Posts() {
                 ))
               )}
             </div>
+
+            {nextCursor && (
+              <div className="mt-6 text-center">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="px-4 py-2 bg-white border rounded-lg shadow hover:bg-gray-50 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         </main>
       </div>
@@ -44,8 +44,23 @@ export const contentAPI = {
   generate: (data) => api.post('/content/generate', data),
 };
 
+export const analyticsAPI = {
+  getSummary: (params) => api.get('/analytics/summary', { params }),
+};
+
+export const mediaAPI = {
+  upload: (file) => {
+    const form = new FormData();
+    form.append('file', file);
+    return api.post('/media', form, { headers: { 'Content-Type': 'multipart/form-data' } });
+  },
+  get: (id) => api.get(`/media/${id}`),
+};
+
 export const postsAPI = {
-  getAll: () => api.get('/posts'),
+  // One page, newest first; the next page's cursor is in the X-Next-Cursor header
+  getPage: (params) => api.get('/posts', { params }),
+  search: (params) => api.get('/posts/search', { params }),
   get: (id) => api.get(`/posts/${id}`),
   create: (data) => api.post('/posts', data),
   update: (id, data) => api.patch(`/posts/${id}`, data),
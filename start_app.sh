@@ -2,6 +2,7 @@
 
 echo "Starting backend server on port 8000..."
 cd backend
+python -m app.migrate
 uvicorn app.main:app --host 127.0.0.1 --port 8000 --reload &
 BACKEND_PID=$!
 
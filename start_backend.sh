@@ -1,3 +1,4 @@
 #!/bin/bash
 cd backend
+python -m app.migrate
 uvicorn app.main:app --host 127.0.0.1 --port 8000 --reload